@@ -1,17 +1,56 @@
+import importlib
+from pathlib import Path
+
 import click
-from .composite import run_example as composite
-from .strategy import run_example as strategy
-from .command import run_example as command
+from . import instrumentation
+
+
+class LazyGroup(click.Group):
+    """
+    A group that only imports a subcommand, and the exercise it runs, once it is asked for. Running one subcommand does
+    not pay for importing the others; only --help imports them all, to list them.
+    """
+
+    def __init__(self, *args, lazy_subcommands: dict[str, str], **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # Subcommand name to "module:attribute" of its click command
+        self.lazy_subcommands = lazy_subcommands
 
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands])
 
-@click.group()
-def cli():
-    pass
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name not in self.lazy_subcommands:
+            return super().get_command(ctx, cmd_name)
+        module, attribute = self.lazy_subcommands[cmd_name].split(":")
+        return getattr(importlib.import_module(module), attribute)
 
 
-cli.command(name="composite", help="Composite exercise example")(composite)
-cli.command(name="strategy", help="Strategy exercise example")(strategy)
-cli.command(name="command", help="Command exercise example")(command)
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "bench": "exercises.bench:bench_cli",
+        "command": "exercises.command.cli:command_cli",
+        "command-service": "exercises.command.cli:command_service_cli",
+        "composite": "exercises.composite.cli:composite_cli",
+        "serve": "exercises.serve:serve_cli",
+        "strategy": "exercises.strategy.cli:strategy_cli",
+    },
+)
+@click.option(
+    "--metrics",
+    "metrics_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Count and time the hot paths of the command, writing the metrics here once it ends",
+)
+@click.option("--metrics-format", type=click.Choice(instrumentation.FORMATS), default="prometheus", show_default=True)
+@click.pass_context
+def cli(ctx, metrics_path, metrics_format):
+    if metrics_path is None:
+        return
+    metrics = instrumentation.enable()
+    # Written even if the command fails, as that is when they are most needed
+    ctx.call_on_close(lambda: metrics_path.write_text(metrics.render(metrics_format)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,246 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import click
+
+from .command.benchmark import generate_commands
+from .command.command import apply_command
+from .command.history import DeltaHistory
+from .composite.benchmark import POPULATIONS, generate_records
+from .composite.composite import validate
+from .strategy.benchmark import generate_loans
+from .strategy.portfolio import Portfolio, create_monthly_repayments
+
+
+# The batches of a workload, and a function that processes one batch
+Prepared = tuple[list[Any], Callable[[Any], object]]
+
+
+@dataclass
+class Workload:
+    name: str
+    unit: str
+    size: int
+    # Makes a workload of the given size from the given seed
+    prepare: Callable[[int, int], Prepared]
+
+
+def _batches(items: list, batch_size: int) -> list[list]:
+    return [items[start : start + batch_size] for start in range(0, len(items), batch_size)]
+
+
+def _command_workload(size: int, seed: int) -> Prepared:
+    """
+    One long edit log with undos, merges, splits and rollbacks, executed a thousand commands at a time.
+    """
+    history = DeltaHistory()
+
+    def run(batch: list) -> None:
+        for command in batch:
+            apply_command(history, command)
+
+    return _batches(generate_commands(size, seed), 1_000), run
+
+
+def _composite_workload(size: int, seed: int) -> Prepared:
+    """
+    Federated, login and invalid user records shuffled together, validated a thousand at a time.
+    """
+    records = [
+        record for population in POPULATIONS for record in generate_records(size // len(POPULATIONS), population, seed)
+    ]
+    random.Random(seed).shuffle(records)
+    return _batches(records, 1_000), lambda batch: [validate(user_data) for user_data in batch]
+
+
+def _strategy_workload(size: int, seed: int) -> Prepared:
+    """
+    Loans of every kind, worked out ten thousand at a time.
+    """
+    portfolios = [Portfolio.from_loans(batch) for batch in _batches(generate_loans(size, seed), 10_000)]
+    return portfolios, create_monthly_repayments
+
+
+# Peak memory may grow by this much on top of the tolerance, so workloads that hardly allocate do not fail on noise
+MEMORY_SLACK_MIB = 1.0
+
+# The results of the full workloads with the default seed. Throughputs are stored relative to the calibration loop
+# only, as absolute ones would only hold on the machine they were measured on. For a tighter gate, CI can record a
+# baseline of its own on the same runner: run `python -m exercises bench --save-baseline base.json` on the target
+# branch, then `python -m exercises bench --baseline base.json` on the change.
+BASELINE = Path(__file__).with_name("bench_baseline.json")
+BASELINE_FIELDS = ("name", "unit", "items", "relative", "peak_mib")
+
+CALIBRATION_SIZE = 100_000
+
+
+def calibrate(repeat: int = 5) -> float:
+    """
+    Iterations per second of a loop of the dict, list and string operations the workloads are made of, the best of
+    repeat runs. Dividing a throughput by it takes out most of the speed of the machine and its load at the time.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        document: dict[int, str] = {}
+        parts: list[str] = []
+        for i in range(CALIBRATION_SIZE):
+            document[i % 1_000] = str(i)
+            parts.append(document.get((i * 7) % 1_000, ""))
+            if len(parts) > 100:
+                " ".join(parts).split()
+                parts.clear()
+        best = min(best, time.perf_counter() - start)
+    return CALIBRATION_SIZE / best
+
+
+WORKLOADS = [
+    Workload("command", "commands", 200_000, _command_workload),
+    Workload("composite", "records", 300_000, _composite_workload),
+    Workload("strategy", "loans", 500_000, _strategy_workload),
+]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    unit: str
+    items: int
+    throughput: float
+    # Throughput per iteration of the calibration loop in the same process, which can be compared across machines
+    relative: float
+    # Latency of a batch
+    p50_ms: float
+    p99_ms: float
+    peak_mib: float
+
+    def line(self) -> str:
+        return (
+            f"{self.name:<10} {self.throughput:12.0f} {self.unit}/s ({self.relative:6.3f} relative)  "
+            f"p50 {self.p50_ms:8.2f} ms  p99 {self.p99_ms:8.2f} ms  {self.peak_mib:8.1f} MiB peak"
+        )
+
+
+def run_workload(workload: Workload, scale: float = 1.0, seed: int = 0) -> BenchResult:
+    """
+    Times every batch of the workload, then runs it again with tracing on for its peak memory, which tracing would
+    otherwise slow down. The calibration loop runs right before and after the batches, for the relative throughput
+    to follow the machine as its load changes.
+    """
+    size = max(int(workload.size * scale), 1)
+    batches, run = workload.prepare(size, seed)
+    calibration = calibrate()
+    latencies: list[float] = []
+    for batch in batches:
+        start = time.perf_counter()
+        run(batch)
+        latencies.append(time.perf_counter() - start)
+    calibration = (calibration + calibrate()) / 2
+
+    batches, run = workload.prepare(size, seed)
+    tracemalloc.start()
+    for batch in batches:
+        run(batch)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    items = sum(map(len, batches))
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p99 = percentiles[49], percentiles[98]
+    else:
+        p50 = p99 = latencies[0]
+    return BenchResult(
+        name=workload.name,
+        unit=workload.unit,
+        items=items,
+        throughput=items / sum(latencies),
+        relative=items / sum(latencies) / calibration,
+        p50_ms=p50 * 1000,
+        p99_ms=p99 * 1000,
+        peak_mib=peak / 1024 / 1024,
+    )
+
+
+def compare(results: list[BenchResult], baseline: dict[str, dict], tolerance: float = 0.2) -> list[str]:
+    """
+    The regressions against a baseline: relative throughput lower, or peak memory higher, by more than the tolerance.
+    Latencies are reported but not compared, as they are too noisy on shared machines.
+    """
+    regressions: list[str] = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+        if base["items"] != result.items:
+            regressions.append(f"{result.name}: baseline has {base['items']} {result.unit}, this run {result.items}")
+            continue
+        if result.relative < base["relative"] * (1 - tolerance):
+            regressions.append(
+                f"{result.name}: relative throughput {result.relative:.3f}, baseline {base['relative']:.3f}"
+            )
+        if result.peak_mib > base["peak_mib"] * (1 + tolerance) + MEMORY_SLACK_MIB:
+            regressions.append(
+                f"{result.name}: peak memory {result.peak_mib:.1f} MiB, baseline {base['peak_mib']:.1f} MiB"
+            )
+    return regressions
+
+
+def load_baseline(path: Path) -> dict[str, dict]:
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, results: list[BenchResult]) -> None:
+    """
+    Writes what compare needs of the results, leaving out the figures that only hold on this machine.
+    """
+    baseline = {
+        result.name: {key: value for key, value in asdict(result).items() if key in BASELINE_FIELDS}
+        for result in results
+    }
+    path.write_text(json.dumps(baseline, indent=2) + "\n")
+
+
+@click.command(name="bench", help="Benchmark every exercise on seeded workloads")
+@click.option(
+    "--only",
+    multiple=True,
+    type=click.Choice([workload.name for workload in WORKLOADS]),
+    help="Only run these workloads",
+)
+@click.option("--scale", default=1.0, show_default=True, help="Multiplies the size of every workload")
+@click.option("--seed", default=0, show_default=True)
+@click.option(
+    "--baseline",
+    "baseline_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help=f"Results JSON to compare with, failing on regressions, such as {BASELINE.name} next to this module",
+)
+@click.option(
+    "--save-baseline",
+    "save_baseline_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Write the results as a baseline JSON",
+)
+@click.option("--tolerance", default=0.2, show_default=True, help="Share a result may be worse than the baseline")
+def bench_cli(only, scale, seed, baseline_path, save_baseline_path, tolerance):
+    results = []
+    for workload in WORKLOADS:
+        if only and workload.name not in only:
+            continue
+        result = run_workload(workload, scale, seed)
+        click.echo(result.line())
+        results.append(result)
+    if save_baseline_path is not None:
+        save_baseline(save_baseline_path, results)
+    if baseline_path is not None:
+        regressions = compare(results, load_baseline(baseline_path), tolerance)
+        if regressions:
+            raise click.ClickException("Regressions against the baseline:\n" + "\n".join(regressions))
@@ -0,0 +1,150 @@
+import random
+import sys
+import time
+import tracemalloc
+
+from .command import Command, apply_command, execute_commands
+from .compiled import compile_commands, execute_compiled
+from .history import DeltaHistory, History, PersistentHistory, SnapshotHistory
+
+
+def generate_commands(count: int, seed: int = 0, id_count: int | None = None) -> list[Command]:
+    """
+    A long edit log over many ids: mostly inserts and updates, with merges, splits, undos and the odd commit and
+    rollback mixed in. There are a quarter as many ids as commands, unless id_count is given, which bounds the size
+    of the document.
+    """
+    rng = random.Random(seed)
+    if id_count is None:
+        id_count = max(count // 4, 1)
+    words = ["lorem", "ipsum dolor", "sit amet", "consectetur", "adipiscing elit"]
+    commands: list[Command] = []
+    # The log is executed as it is generated, to know where a rollback would go back to
+    history = DeltaHistory()
+    while len(commands) < count:
+        start = len(commands)
+        roll = rng.random()
+        command_id = rng.randrange(id_count)
+        other_id = rng.randrange(id_count)
+        if roll < 0.4:
+            commands.append(Command("insert", id=command_id, value=rng.choice(words)))
+        elif roll < 0.6:
+            commands.append(Command("update", id=command_id, value=rng.choice(words)))
+        elif roll < 0.65:
+            commands.append(Command("delete", id=command_id))
+        elif roll < 0.72:
+            commands.append(Command("merge", id=command_id, other_id=other_id))
+        elif roll < 0.79:
+            commands.append(Command("split", id=command_id, other_id=other_id))
+        elif roll < 0.82:
+            commands.append(Command("move", id=command_id, other_id=other_id))
+        elif roll < 0.97:
+            commands.append(Command("undo"))
+        elif roll < 0.99:
+            commands.append(Command("commit"))
+        elif history.last_commit > 0:
+            # A rollback to the start would empty the history, and the commit after it could not be rolled back to.
+            # Committing straight after each rollback keeps the next one from going back further than this one did.
+            commands.append(Command("rollback"))
+            commands.append(Command("commit"))
+        for command in commands[start:]:
+            apply_command(history, command)
+    return commands[:count]
+
+
+def measure(commands: list[Command], history: History) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    execute_commands(commands, history)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_benchmark(
+    counts: tuple[int, ...] = (1_000, 10_000, 100_000), snapshot_limit: int = 10_000, bounded_ids: int = 1_000
+):
+    """
+    Every history on logs over a quarter as many ids as commands, except the snapshot history beyond snapshot_limit
+    commands, which would copy a document of that many ids for every change. Then every history again, the snapshot
+    one included, on logs whose document is bounded to bounded_ids ids, for the comparison at every count.
+    """
+    for count in counts:
+        commands = generate_commands(count)
+        histories: list[tuple[str, History]] = [("delta", DeltaHistory()), ("persistent", PersistentHistory())]
+        if count <= snapshot_limit:
+            histories.insert(0, ("snapshot", SnapshotHistory()))
+        for name, history in histories:
+            elapsed, peak = measure(commands, history)
+            print(f"{count:>8} commands  {name:<10}  {elapsed:8.3f}s  {peak / 1024 / 1024:10.2f} MiB peak")
+        if count > snapshot_limit:
+            print(
+                f"{count:>8} commands  snapshot    skipped (grows with commands x document size, see the bounded runs)"
+            )
+
+    for count in counts:
+        commands = generate_commands(count, id_count=bounded_ids)
+        for name, history in (
+            ("snapshot", SnapshotHistory()),
+            ("delta", DeltaHistory()),
+            ("persistent", PersistentHistory()),
+        ):
+            elapsed, peak = measure(commands, history)
+            print(
+                f"{count:>8} commands  {name:<10}  {elapsed:8.3f}s  {peak / 1024 / 1024:10.2f} MiB peak"
+                f"  ({bounded_ids} ids)"
+            )
+
+
+def run_dispatch_benchmark(count: int = 100_000):
+    commands = generate_commands(count)
+    compiled = compile_commands(commands)
+
+    objects_size = sys.getsizeof(commands) + sum(
+        sys.getsizeof(command) + sys.getsizeof(command.__dict__) for command in commands
+    )
+    columns = (compiled.opcodes, compiled.present, compiled.ids, compiled.values, compiled.other_ids)
+    columns_size = sum(sys.getsizeof(column) for column in columns)
+    print(f"{count:>8} commands  Command objects  {objects_size / 1024 / 1024:8.2f} MiB (excluding values)")
+    print(f"{count:>8} commands  compiled columns {columns_size / 1024 / 1024:8.2f} MiB")
+
+    start = time.perf_counter()
+    execute_commands(commands)
+    print(f"{count:>8} commands  execute_commands {time.perf_counter() - start:8.3f}s")
+    start = time.perf_counter()
+    execute_compiled(compiled)
+    print(f"{count:>8} commands  execute_compiled {time.perf_counter() - start:8.3f}s")
+
+
+def generate_merge_chain(count: int) -> list[Command]:
+    """
+    Merges a new word into the same id count times, splitting a word back off every tenth merge.
+    """
+    commands = [Command("insert", id=0, value="start")]
+    for index in range(count):
+        commands.append(Command("insert", id=1, value=f"word{index}"))
+        commands.append(Command("merge", id=0, other_id=1))
+        if index % 10 == 9:
+            commands.append(Command("split", id=0, other_id=1))
+            commands.append(Command("merge", id=0, other_id=1))
+    return commands
+
+
+def run_merge_benchmark(counts: tuple[int, ...] = (1_000, 5_000, 20_000)):
+    for count in counts:
+        commands = generate_merge_chain(count)
+        for name, ropes in (("strings", False), ("ropes", True)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            execute_commands(commands, ropes=ropes)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{count:>8} merges  {name:<8}  {elapsed:8.3f}s  {peak / 1024 / 1024:10.2f} MiB peak")
+
+
+if __name__ == "__main__":
+    run_benchmark()
+    run_dispatch_benchmark()
+    run_merge_benchmark()
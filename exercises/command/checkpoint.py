@@ -0,0 +1,336 @@
+import hashlib
+import json
+import os
+import struct
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO
+
+from .command import Command, command_applier
+from .history import DeltaHistory, apply_delta
+
+# File layout: magic and format version, then one line per save. The first line holds the whole state of the history
+# as JSON, and each line after it only what changed since the line before, so a save costs what changed rather than
+# the whole history. Every line ends with the number of commands executed and the digest of those commands, which
+# identify the log. Loading a checkpoint only ever builds data, whatever the file holds, unlike unpickling it would.
+HEADER = struct.Struct("<4sB")
+MAGIC = b"DPCK"
+VERSION = 3
+# Room enough for the position and digest at the end of a line
+TRAILER_SIZE = 64
+
+
+class TrackedHistory(DeltaHistory):
+    """
+    DeltaHistory keeping track of what has changed since the last call to changes, for a checkpoint to append only
+    that. Only undo and rollback do any tracking, so executing commands costs what it does with a DeltaHistory.
+
+    The keys a change touches end up in the deltas it records, or in those an undo or rollback restores, except
+    while the history is empty or the first snapshot is live, when the whole document is taken instead.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # The deltas from this index on may have changed, been added or been dropped
+        self._changed_from = 0
+        # Keys of the deltas restored by undo and rollback
+        self._restored: set[int] = set()
+        self._whole_document = False
+
+    def rollback(self) -> None:
+        if self._detached is not None:
+            self._restored.update(self._detached)
+        for delta in self._deltas[max(self.last_commit - 1, 0) :]:
+            self._restored.update(delta)
+        super().rollback()
+        self._changed_from = min(self._changed_from, len(self._deltas))
+        self._whole_document = self._whole_document or self._length == 0
+
+    def undo(self) -> None:
+        count = len(self._deltas)
+        last = self._deltas[-1] if self._deltas else {}
+        super().undo()
+        if len(self._deltas) != count:
+            self._restored.update(last)
+            # Changes after an undo also change the deltas either side of the live snapshot
+            self._changed_from = min(self._changed_from, max(len(self._deltas) - 1, 0))
+            self._whole_document = self._whole_document or self._live == 0
+
+    def changes(self) -> dict:
+        """
+        What changed since the last call, or since the history was created or loaded, in the form of state.
+
+        A key added to the document goes to its end, so every key added since the last call is among the touched
+        keys the document ends with. Those are taken in order, apart from the keys changed in place, for the
+        document to keep its order when the changes are applied.
+        """
+        document = self.document
+        if self._whole_document:
+            changed, added = list(document.items()), []
+        else:
+            touched = set(self._restored)
+            for delta in self._deltas[self._changed_from :]:
+                touched.update(delta)
+            added = []
+            for key in reversed(document):
+                if key not in touched:
+                    break
+                added.append([key, document[key]])
+            added.reverse()
+            changed = [[key, document.get(key)] for key in touched.difference(key for key, _ in added)]
+        changes = {
+            "whole_document": self._whole_document,
+            "document": changed,
+            "added": added,
+            "keep": self._changed_from,
+            "deltas": [list(delta.items()) for delta in self._deltas[self._changed_from :]],
+            "last_commit": self.last_commit,
+            "length": self._length,
+            "live": self._live,
+            "detached": None if self._detached is None else list(self._detached.items()),
+        }
+        self.forget_changes()
+        return changes
+
+    def forget_changes(self) -> None:
+        self._changed_from = len(self._deltas)
+        if self._live is not None:
+            self._changed_from = max(self._live - 1, 0)
+        self._restored = set()
+        self._whole_document = self._length == 0 or self._live == 0
+
+    def apply_changes(self, changes: dict) -> None:
+        if changes["whole_document"]:
+            self.document = dict(changes["document"])
+        else:
+            document = self.document
+            for key, _ in changes["added"]:
+                document.pop(key, None)
+            apply_delta(document, dict(changes["document"]))
+            document.update(changes["added"])
+        del self._deltas[changes["keep"] :]
+        self._deltas.extend(dict(delta) for delta in changes["deltas"])
+        self.last_commit = changes["last_commit"]
+        self._length = changes["length"]
+        self._live = changes["live"]
+        self._detached = None if changes["detached"] is None else dict(changes["detached"])
+
+
+class LogDigest:
+    """
+    Counts and digests the commands of a log as they are read. Once as many have been read as a checkpoint covers,
+    they are checked against the checkpoint, so it cannot be resumed against another log.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._hash = hashlib.blake2b(digest_size=16)
+        self._expected: tuple[int, str] | None = None
+
+    def update(self, command: bytes) -> None:
+        self._hash.update(command + b"\n")
+        self.count += 1
+        if self._expected is not None and self.count >= self._expected[0]:
+            self._check()
+
+    def update_many(self, commands: bytes, count: int) -> None:
+        """
+        The same as updating with each of count commands in turn, given joined by newlines.
+        """
+        self._hash.update(commands + b"\n")
+        self.count += count
+        if self._expected is not None and self.count >= self._expected[0]:
+            self._check()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+    def expect(self, count: int, digest: str) -> None:
+        self._expected = (count, digest)
+        if self.count >= count:
+            self._check()
+
+    def finish(self) -> None:
+        """
+        Raises ValueError if the log ended before the commands the checkpoint covers.
+        """
+        if self._expected is not None and self.count < self._expected[0]:
+            raise ValueError(f"The log has {self.count} commands, fewer than the {self._expected[0]} checkpointed")
+
+    def _check(self) -> None:
+        count, digest = self._expected
+        self._expected = None
+        if self.count != count or self.hexdigest() != digest:
+            raise ValueError(f"The first {count} commands of the log are not the ones checkpointed")
+
+
+def _encode(commands: list[Command]) -> bytes:
+    return "\n".join(
+        [f"{command.command_kind}\t{command.id}\t{command.value!r}\t{command.other_id}" for command in commands]
+    ).encode()
+
+
+def _digested(commands: Iterable[Command], log: LogDigest, position: int, interval: int) -> Iterator[Command]:
+    """
+    The commands, digested a chunk at a time as they are read. The chunks end at position and every interval
+    commands after it, so the digest is up to date whenever the checkpoint is checked or saved.
+    """
+    iterator = iter(commands)
+    size = position % interval or interval
+    while chunk := list(islice(iterator, size)):
+        log.update_many(_encode(chunk), len(chunk))
+        yield from chunk
+        size = interval
+
+
+def _line(data: dict, position: int, digest: str) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode() + f" {position} {digest}\n".encode()
+
+
+def save_checkpoint(path: Path, history: TrackedHistory, position: int, digest: str) -> int:
+    """
+    Writes the whole history after `position` commands as the only line, returning its size. The file is replaced
+    atomically, so a crash while writing leaves the previous checkpoint intact.
+    """
+    line = _line({"state": history.state()}, position, digest)
+    history.forget_changes()
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION))
+        file.write(line)
+    os.replace(temporary, path)
+    return len(line)
+
+
+def append_checkpoint(path: Path, history: TrackedHistory, position: int, digest: str) -> int:
+    """
+    Appends what changed since the last save, returning its size. A crash while writing leaves a line without its
+    newline, which loading ignores.
+    """
+    line = _line({"changes": history.changes()}, position, digest)
+    with open(path, "ab") as file:
+        file.write(line)
+    return len(line)
+
+
+@contextmanager
+def _open(path: Path) -> Iterator[BinaryIO]:
+    with open(path, "rb") as file:
+        magic, version = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a checkpoint file: {path}")
+        yield file
+
+
+def _saved_end(file: BinaryIO) -> int:
+    """
+    Where the last complete line ends, or the end of the header if there is none.
+    """
+    end = file.seek(0, os.SEEK_END)
+    while end > HEADER.size:
+        start = max(end - 64 * 1024, HEADER.size)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return HEADER.size
+
+
+def _trailer(line: bytes) -> tuple[bytes, int, str]:
+    data, position, digest = line.rstrip(b"\n").rsplit(b" ", 2)
+    return data, int(position), digest.decode()
+
+
+def checkpoint_position(path: Path) -> int:
+    """
+    The number of commands a checkpoint covers, read from the end of its last line only. 0 if there is no checkpoint
+    yet.
+    """
+    if not path.exists() or path.stat().st_size < HEADER.size:
+        return 0
+    with _open(path) as file:
+        end = _saved_end(file)
+        if end == HEADER.size:
+            return 0
+        start = max(end - TRAILER_SIZE, HEADER.size)
+        file.seek(start)
+        return _trailer(file.read(end - start))[1]
+
+
+def _load(path: Path) -> tuple[TrackedHistory, int, str, int] | None:
+    """
+    The history, position and digest of the last complete save, and where it ends.
+    """
+    if not path.exists() or path.stat().st_size < HEADER.size:
+        return None
+    with _open(path) as file:
+        end = _saved_end(file)
+        if end == HEADER.size:
+            return None
+        file.seek(HEADER.size)
+        lines = file.read(end - HEADER.size).splitlines()
+    data, position, digest = _trailer(lines[0])
+    history = TrackedHistory.from_state(json.loads(data)["state"])
+    for line in lines[1:]:
+        data, position, digest = _trailer(line)
+        history.apply_changes(json.loads(data)["changes"])
+    history.forget_changes()
+    return history, position, digest, end
+
+
+def load_checkpoint(path: Path) -> tuple[DeltaHistory, int] | None:
+    loaded = _load(path)
+    return None if loaded is None else loaded[:2]
+
+
+def execute_with_checkpoints(
+    commands: Iterable[Command], path: Path, interval: int = 10_000, log: LogDigest | None = None
+) -> dict[int, str]:
+    """
+    Executes the commands like execute_commands, saving a checkpoint to path every `interval` commands and at the
+    end. If path already holds a checkpoint, execution resumes from it, and only the commands after it are executed.
+
+    Without log, `commands` is the whole log, and the commands the checkpoint covers are checked against it and
+    skipped. With log, `commands` starts right after the checkpoint, and the caller feeds log every command of the
+    whole log as it is read, as read_commands does, for the checkpoint to be checked against.
+    """
+    loaded = _load(path)
+    if loaded is None:
+        history, position, digest, end = TrackedHistory(), 0, None, 0
+    else:
+        history, position, digest, end = loaded
+        if path.stat().st_size > end:
+            # Drops the line a crash left unfinished, for the next one to follow the last complete save
+            os.truncate(path, end)
+
+    if log is None:
+        log = LogDigest()
+        commands = islice(_digested(commands, log, position, interval), position, None)
+    if digest is not None:
+        log.expect(position, digest)
+
+    # The lines are rewritten as a single one once the changes appended take more room than the state before them,
+    # which keeps the file within about twice the size of the state, and the writing in proportion to the changes
+    base_size = 0 if loaded is None else end - HEADER.size
+    appended = 0
+    saved = position
+    apply = command_applier()
+    for command in commands:
+        apply(history, command)
+        position += 1
+        if position - saved >= interval:
+            if not base_size or appended > base_size:
+                base_size, appended = save_checkpoint(path, history, position, log.hexdigest()), 0
+            else:
+                appended += append_checkpoint(path, history, position, log.hexdigest())
+            saved = position
+    log.finish()
+
+    if not base_size:
+        save_checkpoint(path, history, position, log.hexdigest())
+    elif position != saved:
+        append_checkpoint(path, history, position, log.hexdigest())
+    return history.document
@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import click
+
+from . import run_example
+from .jsonl import run_input
+
+
+@click.command(name="command", help="Command exercise example")
+@click.option("--input", "input_file", type=click.File("r"), help="JSONL command log to execute instead of the example")
+@click.option("--commits", is_flag=True, help="Print the document at every commit instead of only at the end")
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Snapshot file to resume from and to write progress to",
+)
+@click.option("--checkpoint-interval", default=10_000, show_default=True, help="Commands between snapshots")
+def command_cli(input_file, commits, checkpoint, checkpoint_interval):
+    if input_file is None:
+        run_example()
+        return
+    if commits and checkpoint is not None:
+        raise click.UsageError("--commits cannot be combined with --checkpoint")
+    run_input(
+        input_file,
+        click.get_text_stream("stdout"),
+        commits=commits,
+        checkpoint=checkpoint,
+        checkpoint_interval=checkpoint_interval,
+    )
+
+
+@click.command(name="command-service", help="Serve the command exercise to live clients over a socket")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--unix", "unix_path", help="Listen on a Unix socket instead of TCP")
+def command_service_cli(host, port, unix_path):
+    # asyncio takes longer to import than the rest of the exercise, so only the service pays for it
+    import asyncio
+
+    from .service import run_service
+
+    asyncio.run(run_service(host, port, unix_path))
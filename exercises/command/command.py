@@ -1,5 +1,10 @@
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
+from time import perf_counter
 
+from .. import instrumentation
+from .history import DeltaHistory, History
+from .rope import Rope
 
 
 # Models:
@@ -12,68 +17,136 @@ class Command:
     other_id: int | None = None
 
 
-def execute_commands(commands: list[Command]) -> dict[int, str]:
-    document: dict[int, str] = {}
+def apply_command(history: History, command: Command, ropes: bool = False) -> bool:
+    """
+    Returns whether the command was applied, rather than ignored, as it is when an id it needs is missing or taken.
+    """
+    document = history.document
+    if command.command_kind == "insert":
+        assert command.id is not None, "Missing id"
+        assert command.value is not None, "Missing value"
+        if command.id in document:
+            return False
+        previous = {command.id: None}
+        document[command.id] = command.value
+    elif command.command_kind == "update":
+        assert command.id is not None, "Missing id"
+        assert command.value is not None, "Missing value"
+        if command.id not in document:
+            return False
+        previous = {command.id: document[command.id]}
+        document[command.id] = command.value
+    elif command.command_kind == "delete":
+        assert command.id is not None, "Missing id"
+        if command.id not in document:
+            return False
+        previous = {command.id: document[command.id]}
+        del document[command.id]
+    elif command.command_kind == "merge":
+        assert command.id is not None, "Missing id"
+        assert command.other_id is not None, "Missing other id"
+        if command.id not in document or command.other_id not in document:
+            return False
+        previous = {command.id: document[command.id], command.other_id: document[command.other_id]}
+        if ropes:
+            document[command.id] = Rope(document[command.id], document[command.other_id])
+        else:
+            document[command.id] = ' '.join([document[command.id], document[command.other_id]])
+        del document[command.other_id]
+    elif command.command_kind == "split":
+        assert command.id is not None, "Missing id"
+        assert command.other_id is not None, "Missing other id"
+        if command.id not in document or command.other_id in document or ' ' not in document[command.id]:
+            return False
+        previous = {command.id: document[command.id], command.other_id: None}
+        document[command.id], document[command.other_id] = document[command.id].split(" ", 1)
+    elif command.command_kind == "move":
+        assert command.id is not None, "Missing id"
+        assert command.other_id is not None, "Missing other id"
+        if command.id not in document or command.other_id in document:
+            return False
+        previous = {command.other_id: None}
+        document[command.other_id] = document[command.id]
+    elif command.command_kind == "commit":
+        history.commit()
+        return True
+    elif command.command_kind == "rollback":
+        history.rollback()
+        return True
+    elif command.command_kind == "undo":
+        history.undo()
+        return True
+    else:
+        raise ValueError(f"Unknown command: {command}")
+    history.record(previous)
+    return True
+
+
+# apply_command, or a function that takes the same arguments
+Applier = Callable[..., bool]
+
+
+def _measured(metrics: instrumentation.Metrics) -> Applier:
+    def apply(history: History, command: Command, ropes: bool = False) -> bool:
+        start = perf_counter()
+        applied = apply_command(history, command, ropes)
+        kind = command.command_kind
+        metrics.observe("exercises_command_seconds", "kind", kind, perf_counter() - start)
+        metrics.count("exercises_commands_total", "kind", kind)
+        if not applied:
+            metrics.count("exercises_commands_skipped_total", "kind", kind)
+        return applied
+
+    return apply
+
+
+def command_applier() -> Applier:
+    """
+    apply_command, or while instrumentation is on, apply_command timing and counting every command by kind, and
+    counting the ones it ignores. Loops look this up once, rather than checking for every command.
+    """
+    metrics = instrumentation.active
+    return apply_command if metrics is None else _measured(metrics)
 
-    history: list[dict[int, str]] = [document.copy()]
-    last_commit = 0
 
+def materialise(document: dict[int, str]) -> dict[int, str]:
+    return {key: str(value) for key, value in document.items()}
+
+
+def execute_commands(
+    commands: Iterable[Command], history: History | None = None, ropes: bool = False
+) -> dict[int, str]:
+    """
+    With ropes, merged values are kept as Ropes while executing and only joined into strings at the end. A history
+    keeping its document in something other than a dict, such as a PersistentDocument, has it copied into one.
+    """
+    if history is None:
+        history = DeltaHistory()
+
+    apply = command_applier()
     for command in commands:
-        if command.command_kind == "insert":
-            assert command.id is not None, "Missing id"
-            assert command.value is not None, "Missing value"
-            if command.id in document:
-                continue
-            document[command.id] = command.value
-        elif command.command_kind == "update":
-            assert command.id is not None, "Missing id"
-            assert command.value is not None, "Missing value"
-            if command.id not in document:
-                continue
-            document[command.id] = command.value
-        elif command.command_kind == "delete":
-            assert command.id is not None, "Missing id"
-            if command.id not in document:
-                continue
-            del document[command.id]
-        elif command.command_kind == "merge":
-            assert command.id is not None, "Missing id"
-            assert command.other_id is not None, "Missing other id"
-            if command.id not in document or command.other_id not in document:
-                continue
-            document[command.id] = ' '.join([document[command.id], document[command.other_id]])
-            del document[command.other_id]
-        elif command.command_kind == "split":
-            assert command.id is not None, "Missing id"
-            assert command.other_id is not None, "Missing other id"
-            if command.id not in document or command.other_id in document or ' ' not in document[command.id]:
-                continue
-            document[command.id], document[command.other_id] = document[command.id].split(" ", 1)
-        elif command.command_kind == "move":
-            assert command.id is not None, "Missing id"
-            assert command.other_id is not None, "Missing other id"
-            if command.id not in document or command.other_id in document:
-                continue
-            document[command.other_id] = document[command.id]
-        elif command.command_kind == "commit":
-            last_commit = len(history) - 1
-            continue
-        elif command.command_kind == "rollback":
-            document = history[last_commit]
-            while len(history) > last_commit:
-                history.pop(-1)
-            continue
-        elif command.command_kind == "undo":
-            if len(history) < 2 or len(history) - 1 <= last_commit:
-                continue
-            document = history[-2]
-            history.pop(-1)
-            continue
-        else:
-            raise ValueError(f"Unknown command: {command}")
-        history.append(document.copy())
+        apply(history, command, ropes)
 
-    return document
+    if ropes:
+        return materialise(history.document)
+    document = history.document
+    return document if type(document) is dict else dict(document.items())
+
+
+def iter_commits(
+    commands: Iterable[Command], history: History | None = None, ropes: bool = False
+) -> Iterator[dict[int, str]]:
+    """
+    Executes the commands one at a time as they are read, yielding a copy of the document at every commit.
+    """
+    if history is None:
+        history = DeltaHistory()
+
+    apply = command_applier()
+    for command in commands:
+        apply(history, command, ropes)
+        if command.command_kind == "commit":
+            yield materialise(history.document) if ropes else history.document.copy()
 
 
 def run_example():
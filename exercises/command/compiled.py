@@ -0,0 +1,203 @@
+from array import array
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+
+from .command import Command
+from .history import Delta, DeltaHistory, History
+
+
+INSERT, UPDATE, DELETE, MERGE, SPLIT, MOVE, COMMIT, ROLLBACK, UNDO, UNKNOWN = range(10)
+OPCODES = {
+    "insert": INSERT,
+    "update": UPDATE,
+    "delete": DELETE,
+    "merge": MERGE,
+    "split": SPLIT,
+    "move": MOVE,
+    "commit": COMMIT,
+    "rollback": ROLLBACK,
+    "undo": UNDO,
+}
+
+# Bits of the presence column, saying which of id and other_id a command has. The id columns hold 0 where it has not,
+# as every int64 is a valid id.
+HAS_ID = 1
+HAS_OTHER_ID = 2
+NO_VALUE = -1
+
+
+@dataclass
+class CompiledCommands:
+    """
+    A command log as parallel columns: one opcode, presence, id, value offset and other_id per command.
+    Values are interned, so a log that repeats the same few values only stores each of them once.
+    """
+
+    opcodes: array = field(default_factory=lambda: array("B"))
+    present: array = field(default_factory=lambda: array("B"))
+    ids: array = field(default_factory=lambda: array("q"))
+    values: array = field(default_factory=lambda: array("i"))
+    other_ids: array = field(default_factory=lambda: array("q"))
+    strings: list[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.opcodes)
+
+
+def compile_commands(commands: Iterable[Command]) -> CompiledCommands:
+    """
+    Raises ValueError for an id or other_id that does not fit in an int64 column.
+    """
+    compiled = CompiledCommands()
+    interned: dict[str, int] = {}
+
+    def intern(value: str) -> int:
+        if value not in interned:
+            interned[value] = len(compiled.strings)
+            compiled.strings.append(value)
+        return interned[value]
+
+    for command in commands:
+        opcode = OPCODES.get(command.command_kind, UNKNOWN)
+        try:
+            compiled.ids.append(0 if command.id is None else command.id)
+            compiled.other_ids.append(0 if command.other_id is None else command.other_id)
+        except OverflowError:
+            raise ValueError(f"Ids must fit in an int64 to be compiled: {command}") from None
+        compiled.opcodes.append(opcode)
+        compiled.present.append(
+            (0 if command.id is None else HAS_ID) | (0 if command.other_id is None else HAS_OTHER_ID)
+        )
+        if opcode == UNKNOWN:
+            # Keeps the error execute_commands would raise, for when the interpreter reaches this command
+            compiled.values.append(intern(f"Unknown command: {command}"))
+        else:
+            compiled.values.append(NO_VALUE if command.value is None else intern(command.value))
+    return compiled
+
+
+def _insert(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    assert value != NO_VALUE, "Missing value"
+    document = history.document
+    if command_id in document:
+        return None
+    document[command_id] = strings[value]
+    return {command_id: None}
+
+
+def _update(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    assert value != NO_VALUE, "Missing value"
+    document = history.document
+    if command_id not in document:
+        return None
+    previous: Delta = {command_id: document[command_id]}
+    document[command_id] = strings[value]
+    return previous
+
+
+def _delete(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    document = history.document
+    if command_id not in document:
+        return None
+    return {command_id: document.pop(command_id)}
+
+
+def _merge(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    assert present & HAS_OTHER_ID, "Missing other id"
+    document = history.document
+    if command_id not in document or other_id not in document:
+        return None
+    previous: Delta = {command_id: document[command_id], other_id: document[other_id]}
+    document[command_id] = " ".join([document[command_id], document[other_id]])
+    del document[other_id]
+    return previous
+
+
+def _split(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    assert present & HAS_OTHER_ID, "Missing other id"
+    document = history.document
+    if command_id not in document or other_id in document or " " not in document[command_id]:
+        return None
+    previous: Delta = {command_id: document[command_id], other_id: None}
+    document[command_id], document[other_id] = document[command_id].split(" ", 1)
+    return previous
+
+
+def _move(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    assert present & HAS_ID, "Missing id"
+    assert present & HAS_OTHER_ID, "Missing other id"
+    document = history.document
+    if command_id not in document or other_id in document:
+        return None
+    document[other_id] = document[command_id]
+    return {other_id: None}
+
+
+def _commit(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    history.commit()
+    return None
+
+
+def _rollback(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    history.rollback()
+    return None
+
+
+def _undo(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    history.undo()
+    return None
+
+
+def _unknown(
+    history: History, strings: list[str], present: int, command_id: int, value: int, other_id: int
+) -> Delta | None:
+    raise ValueError(strings[value])
+
+
+Handler = Callable[[History, list[str], int, int, int, int], Delta | None]
+
+# Indexed by opcode
+HANDLERS: list[Handler] = [_insert, _update, _delete, _merge, _split, _move, _commit, _rollback, _undo, _unknown]
+
+
+def execute_compiled(compiled: CompiledCommands, history: History | None = None) -> dict[int, str]:
+    """
+    Runs a compiled log with the same results as execute_commands, dispatching on the opcode through HANDLERS.
+    """
+    if history is None:
+        history = DeltaHistory()
+
+    handlers = HANDLERS
+    strings = compiled.strings
+    record = history.record
+    columns = zip(compiled.opcodes, compiled.present, compiled.ids, compiled.values, compiled.other_ids)
+    for opcode, present, command_id, value, other_id in columns:
+        previous = handlers[opcode](history, strings, present, command_id, value, other_id)
+        if previous is not None:
+            record(previous)
+
+    document = history.document
+    return document if type(document) is dict else dict(document.items())
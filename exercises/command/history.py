@@ -0,0 +1,212 @@
+from collections.abc import MutableMapping
+from typing import Protocol
+
+from .persistent import PersistentDocument, PersistentMap
+
+
+# Maps ids to the value they had before a change, or None if the id was absent
+Delta = dict[int, str | None]
+
+
+class History(Protocol):
+    # Read-only here, so a history may keep its document in a dict or in any other mapping, such as a
+    # PersistentDocument
+    @property
+    def document(self) -> MutableMapping[int, str]: ...
+
+    last_commit: int
+
+    def record(self, previous: Delta) -> None: ...
+
+    def commit(self) -> None: ...
+
+    def rollback(self) -> None: ...
+
+    def undo(self) -> None: ...
+
+
+def apply_delta(document: dict[int, str], delta: Delta) -> None:
+    for key, value in delta.items():
+        if value is None:
+            document.pop(key, None)
+        else:
+            document[key] = value
+
+
+class SnapshotHistory:
+    """
+    The original history of execute_commands: a full copy of the document after every change.
+    Memory grows with the number of changes times the size of the document.
+    """
+
+    def __init__(self) -> None:
+        self.document: dict[int, str] = {}
+        self.last_commit = 0
+        self._history: list[dict[int, str]] = [self.document.copy()]
+
+    def record(self, previous: Delta) -> None:
+        self._history.append(self.document.copy())
+
+    def commit(self) -> None:
+        self.last_commit = len(self._history) - 1
+
+    def rollback(self) -> None:
+        self.document = self._history[self.last_commit]
+        while len(self._history) > self.last_commit:
+            self._history.pop(-1)
+
+    def undo(self) -> None:
+        if len(self._history) < 2 or len(self._history) - 1 <= self.last_commit:
+            return
+        self.document = self._history[-2]
+        self._history.pop(-1)
+
+
+class DeltaHistory:
+    """
+    History that only stores the values each change overwrote, so memory grows with the number of changes.
+
+    It gives exactly the same documents as SnapshotHistory. That includes two quirks of the copying history:
+     - After an undo, the document is the same object as the newest snapshot, so later changes also modify that
+       snapshot ("live" snapshot below).
+     - A rollback drops the snapshot it restored, so the document differs from the newest snapshot until the next
+       change ("detached" below).
+    """
+
+    def __init__(self) -> None:
+        self.document: dict[int, str] = {}
+        self.last_commit = 0
+        # Number of snapshots SnapshotHistory would hold
+        self._length = 1
+        # _deltas[i - 1] turns snapshot i back into snapshot i - 1
+        self._deltas: list[Delta] = []
+        # Index of the snapshot that changes together with the document, if any
+        self._live: int | None = None
+        # Turns the document into the newest snapshot after a rollback
+        self._detached: Delta | None = None
+
+    def record(self, previous: Delta) -> None:
+        if self._length == 0:
+            self._length = 1
+            return
+
+        if self._live is not None:
+            live = self._live
+            if live > 0:
+                # The live snapshot changed, so its way back has to undo this change first
+                back = self._deltas[live - 1]
+                for key, value in previous.items():
+                    back.setdefault(key, value)
+            if live < self._length - 1:
+                # ... and the snapshot after it now has to reach the changed document
+                self._deltas[live].update({key: self.document.get(key) for key in previous})
+                delta = dict(previous)
+            else:
+                delta = {}
+        elif self._detached is not None:
+            delta = self._detached
+            self._detached = None
+            for key, value in previous.items():
+                delta.setdefault(key, value)
+        else:
+            delta = dict(previous)
+
+        self._deltas.append(delta)
+        self._length += 1
+
+    def commit(self) -> None:
+        self.last_commit = self._length - 1
+
+    def rollback(self) -> None:
+        # A commit on an empty history leaves last_commit at -1, which the copying history cannot roll back to either
+        target = self.last_commit
+        if not 0 <= target < self._length:
+            raise IndexError("list index out of range")
+
+        if self._detached is not None:
+            apply_delta(self.document, self._detached)
+        for index in range(self._length - 2, target - 1, -1):
+            apply_delta(self.document, self._deltas[index])
+
+        self._length = target
+        self._detached = self._deltas[target - 1] if target > 0 else None
+        del self._deltas[max(target - 1, 0) :]
+        self._live = None
+
+    def undo(self) -> None:
+        if self._length < 2 or self._length - 1 <= self.last_commit:
+            return
+        apply_delta(self.document, self._deltas.pop())
+        self._length -= 1
+        self._live = self._length - 1
+
+    def state(self) -> dict:
+        """
+        The whole history as lists, ints, strings and None, which JSON can hold. Mappings become lists of
+        [key, value] pairs, as JSON only has string keys.
+        """
+        return {
+            "document": list(self.document.items()),
+            "last_commit": self.last_commit,
+            "length": self._length,
+            "deltas": [list(delta.items()) for delta in self._deltas],
+            "live": self._live,
+            "detached": None if self._detached is None else list(self._detached.items()),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "DeltaHistory":
+        history = cls()
+        history.document = dict(state["document"])
+        history.last_commit = state["last_commit"]
+        history._length = state["length"]
+        history._deltas = [dict(delta) for delta in state["deltas"]]
+        history._live = state["live"]
+        if state["detached"] is not None:
+            history._detached = dict(state["detached"])
+        return history
+
+
+class PersistentHistory:
+    """
+    SnapshotHistory with the document and its snapshots as versions of a PersistentMap, so a snapshot is an O(1)
+    handle that shares all it has in common with the others, rather than a copy.
+
+    Versions cannot change, so the quirk of an undo leaving the document the same object as the newest snapshot is
+    kept by replacing that snapshot with each version of the document, until the next undo or rollback.
+
+    The document as of every commit is kept in commits, for reading any committed version later. That is the document
+    as it was committed, even where the quirk changes the snapshot a rollback goes back to.
+    """
+
+    def __init__(self) -> None:
+        self.document = PersistentDocument()
+        self.last_commit = 0
+        self._history: list[PersistentMap] = [self.document.version]
+        # Index of the snapshot that changes together with the document, if any
+        self._live: int | None = None
+        self.commits: list[PersistentMap] = []
+
+    def record(self, previous: Delta) -> None:
+        if self._live is not None:
+            self._history[self._live] = self.document.version
+        self._history.append(self.document.version)
+
+    def commit(self) -> None:
+        self.last_commit = len(self._history) - 1
+        self.commits.append(self.document.version)
+
+    def rollback(self) -> None:
+        if self.last_commit < 0:
+            # After a commit on an empty history, the copying history pops snapshots until it runs out
+            raise IndexError("pop from empty list")
+        self.document.version = self._history[self.last_commit]
+        del self._history[self.last_commit :]
+        self._live = None
+
+    def undo(self) -> None:
+        if len(self._history) < 2 or len(self._history) - 1 <= self.last_commit:
+            return
+        self.document.version = self._history[-2]
+        self._history.pop(-1)
+        self._live = len(self._history) - 1
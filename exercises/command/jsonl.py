@@ -0,0 +1,52 @@
+import json
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import TextIO
+
+from .checkpoint import LogDigest, checkpoint_position, execute_with_checkpoints
+from .command import Command, execute_commands, iter_commits
+
+
+def read_commands(lines: Iterable[str], skip: int = 0, log: LogDigest | None = None) -> Iterator[Command]:
+    """
+    Parses one command per line, e.g. {"command_kind": "insert", "id": 1, "value": "Hello"}.
+    Lines are only read as the commands are consumed, so the log is never held in memory as a whole.
+    The first `skip` commands are passed over without parsing them. Every command line, skipped or not, is fed to
+    log as it is read.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        if log is not None:
+            log.update(line.strip().encode())
+        if skip > 0:
+            skip -= 1
+            continue
+        yield Command(**json.loads(line))
+
+
+def write_document(document: dict[int, str], output: TextIO) -> None:
+    output.write(json.dumps(document))
+    output.write("\n")
+
+
+def run_input(
+    input_file: TextIO,
+    output: TextIO,
+    commits: bool = False,
+    checkpoint: Path | None = None,
+    checkpoint_interval: int = 10_000,
+) -> None:
+    if checkpoint is not None:
+        # Only the commands after the checkpoint are parsed and executed, the lines before it are only digested
+        log = LogDigest()
+        commands = read_commands(input_file, skip=checkpoint_position(checkpoint), log=log)
+        write_document(execute_with_checkpoints(commands, checkpoint, checkpoint_interval, log), output)
+        return
+
+    commands = read_commands(input_file)
+    if commits:
+        for document in iter_commits(commands):
+            write_document(document, output)
+    else:
+        write_document(execute_commands(commands), output)
@@ -0,0 +1,93 @@
+import asyncio
+import dataclasses
+import json
+import statistics
+import time
+
+import click
+
+from .benchmark import generate_commands
+
+
+async def run_client(
+    host: str, port: int, unix_path: str | None, documents: list[str], commands_per_batch: int, batches: int, seed: int
+) -> list[float]:
+    """
+    Sends batches of commands spread over the given documents, waiting for each batch to be acknowledged.
+    Returns the latency of every batch in seconds.
+    """
+    if unix_path is not None:
+        reader, writer = await asyncio.open_unix_connection(unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+    commands = generate_commands(commands_per_batch * batches, seed=seed)
+    latencies: list[float] = []
+    for batch in range(batches):
+        lines = []
+        for index in range(commands_per_batch):
+            command = commands[batch * commands_per_batch + index]
+            request = {"document": documents[index % len(documents)], "command": dataclasses.asdict(command)}
+            lines.append(json.dumps(request).encode())
+        start = time.perf_counter()
+        writer.write(b"\n".join(lines) + b"\n")
+        await writer.drain()
+        acknowledged = 0
+        while acknowledged < commands_per_batch:
+            acknowledged += json.loads(await reader.readline())["ack"]
+        latencies.append(time.perf_counter() - start)
+
+    writer.close()
+    await writer.wait_closed()
+    return latencies
+
+
+async def run_load(
+    host: str,
+    port: int,
+    unix_path: str | None,
+    clients: int,
+    documents: int,
+    commands_per_batch: int,
+    batches: int,
+) -> None:
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            run_client(
+                host,
+                port,
+                unix_path,
+                [f"doc-{client}-{document}" for document in range(documents)],
+                commands_per_batch,
+                batches,
+                seed=client,
+            )
+            for client in range(clients)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for client_latencies in results for latency in client_latencies)
+    total = clients * commands_per_batch * batches
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"Commands: {total}")
+    print(f"Commands/sec: {total / elapsed:.0f}")
+    print(f"Batch latency p50: {statistics.median(latencies) * 1000:.2f}ms")
+    print(f"Batch latency p99: {p99 * 1000:.2f}ms")
+
+
+@click.command(help="Measure throughput and latency of a running command service")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8765, show_default=True)
+@click.option("--unix", "unix_path", help="Connect to a Unix socket instead of TCP")
+@click.option("--clients", default=8, show_default=True, help="Concurrent connections")
+@click.option("--documents", default=4, show_default=True, help="Documents per connection")
+@click.option("--batch", "commands_per_batch", default=100, show_default=True, help="Commands sent per batch")
+@click.option("--batches", default=100, show_default=True, help="Batches sent per connection")
+def main(host, port, unix_path, clients, documents, commands_per_batch, batches):
+    asyncio.run(run_load(host, port, unix_path, clients, documents, commands_per_batch, batches))
+
+
+if __name__ == "__main__":
+    main()
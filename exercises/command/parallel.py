@@ -0,0 +1,62 @@
+from collections.abc import Hashable, Iterable, Iterator, Mapping
+from dataclasses import dataclass
+
+from ..pool import map_bounded
+from .command import Command, execute_commands
+
+
+@dataclass
+class DocumentResult:
+    document: dict[int, str] | None = None
+    error: str | None = None
+
+
+Chunk = list[tuple[Hashable, list[Command]]]
+
+
+def execute_document(commands: list[Command]) -> DocumentResult:
+    try:
+        return DocumentResult(document=execute_commands(commands))
+    except (AssertionError, ValueError, IndexError) as e:
+        # Missing fields, unknown commands and rollbacks past the start of the history only fail their own document
+        return DocumentResult(error=f"{type(e).__name__}: {e}")
+
+
+def _execute_chunk(chunk: Chunk) -> list[tuple[Hashable, DocumentResult]]:
+    return [(document_id, execute_document(commands)) for document_id, commands in chunk]
+
+
+def chunk_documents(streams: Mapping[Hashable, Iterable[Command]], chunk_commands: int) -> Iterator[Chunk]:
+    """
+    Groups documents in order until they hold at least chunk_commands commands, so many small documents share one
+    round trip to a worker while large ones travel alone.
+    """
+    chunk: Chunk = []
+    size = 0
+    for document_id, stream in streams.items():
+        commands = list(stream)
+        chunk.append((document_id, commands))
+        size += len(commands)
+        if size >= chunk_commands:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+def execute_many(
+    streams: Mapping[Hashable, Iterable[Command]],
+    max_workers: int | None = None,
+    chunk_commands: int = 10_000,
+) -> dict[Hashable, DocumentResult]:
+    """
+    Executes independent command streams over a process pool. Results keep the order of streams, and a document
+    whose commands fail is reported in its DocumentResult without affecting the others.
+    """
+    results: dict[Hashable, DocumentResult] = {}
+    # Only a couple of chunks per worker are read ahead, the rest of the streams stay unread
+    chunks = ((chunk,) for chunk in chunk_documents(streams, chunk_commands))
+    for chunk_results in map_bounded(_execute_chunk, chunks, max_workers):
+        results.update(chunk_results)
+    return results
@@ -0,0 +1,242 @@
+from collections.abc import Hashable, ItemsView, Iterator, Mapping, MutableMapping
+from typing import Any
+
+
+# A hash array mapped trie. A node is a (bitmap, entries) tuple, which maps 5 bits of a key's hash to its slots,
+# starting with the lowest bits. It only holds the slots in use, in the order of their bits, with the bitmap saying
+# which ones those are. The entries hold each slot as a key and value, or as _NODE and a child node for the keys that
+# share those bits of their hashes. Keys whose whole hashes are the same end up in a _Collision.
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = (1 << 64) - 1
+_NODE = object()
+_MISSING = object()
+
+Node = tuple[int, tuple]
+
+
+class _Collision:
+    __slots__ = ("hash", "entries")
+
+    def __init__(self, key_hash: int, entries: tuple) -> None:
+        self.hash = key_hash
+        # Keys and values, one after the other
+        self.entries = entries
+
+
+_EMPTY: Node = (0, ())
+
+
+def _get(node: Node | _Collision, key: Hashable, key_hash: int) -> Any:
+    shift = 0
+    while type(node) is tuple:
+        bitmap, entries = node
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        if not bitmap & bit:
+            return _MISSING
+        index = 2 * (bitmap & (bit - 1)).bit_count()
+        entry_key = entries[index]
+        if entry_key is _NODE:
+            node = entries[index + 1]
+            shift += _BITS
+        elif entry_key is key or entry_key == key:
+            return entries[index + 1]
+        else:
+            return _MISSING
+    entries = node.entries
+    for index in range(0, len(entries), 2):
+        if entries[index] == key:
+            return entries[index + 1]
+    return _MISSING
+
+
+def _pair(shift: int, key1: Hashable, value1: Any, hash1: int, key2: Hashable, value2: Any, hash2: int) -> Any:
+    if hash1 == hash2:
+        return _Collision(hash1, (key1, value1, key2, value2))
+    bit1 = (hash1 >> shift) & _MASK
+    bit2 = (hash2 >> shift) & _MASK
+    if bit1 == bit2:
+        return 1 << bit1, (_NODE, _pair(shift + _BITS, key1, value1, hash1, key2, value2, hash2))
+    if bit1 < bit2:
+        return 1 << bit1 | 1 << bit2, (key1, value1, key2, value2)
+    return 1 << bit1 | 1 << bit2, (key2, value2, key1, value1)
+
+
+def _with(node: Node | _Collision, shift: int, key: Hashable, value: Any, key_hash: int) -> tuple[Any, bool]:
+    """
+    A copy of the path to the key with the key set, sharing every other node, and whether the key is new.
+    """
+    if type(node) is _Collision:
+        entries = node.entries
+        if node.hash != key_hash:
+            # The key belongs beside the collision, in a node of its own
+            return _with((1 << ((node.hash >> shift) & _MASK), (_NODE, node)), shift, key, value, key_hash)
+        for index in range(0, len(entries), 2):
+            if entries[index] == key:
+                return _Collision(key_hash, entries[: index + 1] + (value,) + entries[index + 2 :]), False
+        return _Collision(key_hash, entries + (key, value)), True
+
+    bitmap, entries = node
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    index = 2 * (bitmap & (bit - 1)).bit_count()
+    if not bitmap & bit:
+        return (bitmap | bit, entries[:index] + (key, value) + entries[index:]), True
+    entry_key = entries[index]
+    if entry_key is _NODE:
+        child, added = _with(entries[index + 1], shift + _BITS, key, value, key_hash)
+        return (bitmap, entries[: index + 1] + (child,) + entries[index + 2 :]), added
+    if entry_key is key or entry_key == key:
+        return (bitmap, entries[: index + 1] + (value,) + entries[index + 2 :]), False
+    child = _pair(shift + _BITS, entry_key, entries[index + 1], hash(entry_key) & _HASH_MASK, key, value, key_hash)
+    return (bitmap, entries[:index] + (_NODE, child) + entries[index + 2 :]), True
+
+
+def _without(node: Node | _Collision, shift: int, key: Hashable, key_hash: int) -> Any:
+    """
+    A copy of the path to the key without it, the node itself if the key is not in it, or None if nothing is left.
+    """
+    if type(node) is _Collision:
+        entries = node.entries
+        for index in range(0, len(entries), 2):
+            if entries[index] == key:
+                rest = entries[:index] + entries[index + 2 :]
+                if len(rest) == 2:
+                    # A single key left, which the parent takes in
+                    return 1 << ((node.hash >> shift) & _MASK), rest
+                return _Collision(node.hash, rest)
+        return node
+
+    bitmap, entries = node
+    bit = 1 << ((key_hash >> shift) & _MASK)
+    if not bitmap & bit:
+        return node
+    index = 2 * (bitmap & (bit - 1)).bit_count()
+    entry_key = entries[index]
+    if entry_key is _NODE:
+        child = _without(entries[index + 1], shift + _BITS, key, key_hash)
+        if child is entries[index + 1]:
+            return node
+        if child is not None:
+            if type(child) is tuple and len(child[1]) == 2 and child[1][0] is not _NODE:
+                # A child with a single key is folded into this node
+                return bitmap, entries[:index] + child[1] + entries[index + 2 :]
+            return bitmap, entries[: index + 1] + (child,) + entries[index + 2 :]
+    elif not (entry_key is key or entry_key == key):
+        return node
+    if bitmap == bit:
+        return None
+    return bitmap ^ bit, entries[:index] + entries[index + 2 :]
+
+
+def _items(node: Node | _Collision) -> Iterator[tuple[Any, Any]]:
+    entries = node[1] if type(node) is tuple else node.entries
+    for index in range(0, len(entries), 2):
+        if entries[index] is _NODE:
+            yield from _items(entries[index + 1])
+        else:
+            yield entries[index], entries[index + 1]
+
+
+class _Items(ItemsView):
+    # Walks the trie once, rather than looking every key up again
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        return _items(self._mapping._root)
+
+
+class PersistentMap(Mapping):
+    """
+    An immutable mapping. set and delete return a new map that shares all but the O(log n) nodes on the path to the
+    key with this one, so keeping every version costs only what changed between them.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Mapping | None = None) -> None:
+        self._root: Node = _EMPTY
+        self._size = 0
+        if items:
+            for key, value in items.items():
+                self._root, added = _with(self._root, 0, key, value, hash(key) & _HASH_MASK)
+                self._size += added
+
+    @classmethod
+    def _of(cls, root: Node, size: int) -> "PersistentMap":
+        version = cls.__new__(cls)
+        version._root = root
+        version._size = size
+        return version
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = _get(self._root, key, hash(key) & _HASH_MASK)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = _get(self._root, key, hash(key) & _HASH_MASK)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: object) -> bool:
+        return _get(self._root, key, hash(key) & _HASH_MASK) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        return (key for key, _ in _items(self._root))
+
+    def items(self) -> ItemsView:
+        return _Items(self)
+
+    def set(self, key: Hashable, value: Any) -> "PersistentMap":
+        root, added = _with(self._root, 0, key, value, hash(key) & _HASH_MASK)
+        return PersistentMap._of(root, self._size + added)
+
+    def delete(self, key: Hashable) -> "PersistentMap":
+        root = _without(self._root, 0, key, hash(key) & _HASH_MASK)
+        if root is self._root:
+            raise KeyError(key)
+        return PersistentMap._of(_EMPTY if root is None else root, self._size - 1)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class PersistentDocument(MutableMapping):
+    """
+    A document that changes like a dict, by replacing its version of a PersistentMap with a new one. Taking the
+    version is an O(1) snapshot of the document, which later changes leave as it is.
+    """
+
+    def __init__(self, version: PersistentMap | None = None) -> None:
+        self.version = PersistentMap() if version is None else version
+
+    def __getitem__(self, key: Hashable) -> Any:
+        return self.version[key]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.version.get(key, default)
+
+    def __contains__(self, key: object) -> bool:
+        return _get(self.version._root, key, hash(key) & _HASH_MASK) is not _MISSING
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.version = self.version.set(key, value)
+
+    def __delitem__(self, key: Hashable) -> None:
+        self.version = self.version.delete(key)
+
+    def __len__(self) -> int:
+        return len(self.version)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.version)
+
+    def items(self) -> ItemsView:
+        return self.version.items()
+
+    def copy(self) -> dict:
+        return dict(self.version.items())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.version.items())!r})"
@@ -0,0 +1,54 @@
+class Rope:
+    """
+    Two values joined by a space, without copying either of them.
+
+    Merging into the same id over and over copies the whole value every time with strings, while a Rope only adds one
+    node. It supports the string operations execute_commands needs: checking for a space, splitting on the first
+    space and str() to get the joined value.
+    """
+
+    __slots__ = ("left", "right")
+
+    def __init__(self, left: "str | Rope", right: "str | Rope") -> None:
+        self.left = left
+        self.right = right
+
+    def __contains__(self, item: str) -> bool:
+        return item == " " or item in str(self)
+
+    def split(self, sep: str = " ", maxsplit: int = 1) -> list["str | Rope"]:
+        assert sep == " " and maxsplit == 1, "Rope can only split on the first space"
+
+        # Walk down the left edge to the first space, remembering the right halves passed on the way
+        rights: list[str | Rope] = []
+        node: str | Rope = self
+        while isinstance(node, Rope):
+            if isinstance(node.left, str) and " " not in node.left:
+                head, rest = node.left, node.right
+                break
+            rights.append(node.right)
+            node = node.left
+        else:
+            head, rest = node.split(" ", 1)
+
+        # Hang the right halves off to the right, so the next split finds the first space near the top
+        if rights:
+            tail = rights[0]
+            for right in rights[1:]:
+                tail = Rope(right, tail)
+            rest = Rope(rest, tail)
+        return [head, rest]
+
+    def __str__(self) -> str:
+        parts: list[str] = []
+        stack: list[str | Rope] = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Rope):
+                stack.extend((node.right, " ", node.left))
+            else:
+                parts.append(node)
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"Rope({str(self)!r})"
@@ -0,0 +1,213 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+
+from .command import Command, command_applier
+from .history import DeltaHistory
+
+
+# Stands in for a command in a document's queue to ask for the document's current state
+READ = None
+
+
+@dataclass
+class Batch:
+    """
+    The commands of one read from a client that belong to one document, as (line number, command) pairs.
+    """
+
+    items: list[tuple[int, Command | None]]
+    done: asyncio.Future = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+# Number of lines read, parsing errors and the batches queued for each document
+Pending = tuple[int, list[dict], list[tuple[str, Batch]]]
+
+
+class DocumentWorker:
+    """
+    Owns one document and applies its batches one after the other, in the order they were queued.
+
+    After idle_timeout seconds without a batch, the task applying them finishes, keeping the document, and start
+    runs a new one. An idle document then costs only its history.
+    """
+
+    def __init__(self, queue_size: int, idle_timeout: float | None = None) -> None:
+        self.history = DeltaHistory()
+        self.queue: asyncio.Queue[Batch] = asyncio.Queue(queue_size)
+        self.idle_timeout = idle_timeout
+        self.task = asyncio.create_task(self.run())
+
+    def start(self) -> None:
+        if self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self) -> None:
+        while True:
+            try:
+                batch = await asyncio.wait_for(self.queue.get(), self.idle_timeout)
+            except TimeoutError:
+                if self.queue.empty():
+                    return
+                # A batch came in just as the wait timed out
+                continue
+            errors: list[dict] = []
+            state: dict[int, str] | None = None
+            apply = command_applier()
+            for line, command in batch.items:
+                if command is READ:
+                    state = dict(self.history.document)
+                    continue
+                try:
+                    apply(self.history, command)
+                except Exception as e:
+                    # A bad command is reported to its client, the document and the worker carry on
+                    errors.append({"line": line, "error": f"{type(e).__name__}: {e}"})
+            batch.done.set_result((errors, state))
+
+    async def close(self) -> None:
+        """
+        Stops the task, cancelling the batches it has not applied yet.
+        """
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        while not self.queue.empty():
+            self.queue.get_nowait().done.cancel()
+
+
+class CommandService:
+    """
+    Accepts newline-delimited JSON from any number of clients and keeps one document per id in memory.
+
+    Each line is either a command for a document, {"document": "a", "command": {"command_kind": "insert", ...}}, or a
+    request for its current state, {"document": "a", "read": true}. Every chunk read from a client is acknowledged
+    with a single line once all of its commands are applied: {"ack": <lines>, "errors": [...], "documents": {...}}.
+    Errors refer to lines by their position among the lines of that acknowledgement.
+
+    Backpressure: each document queues at most queue_size batches, and each client has at most max_unacked chunks
+    waiting to be acknowledged. When either is full, the service stops reading from that client. A line longer than
+    max_line_size bytes is acknowledged with an error and the connection closed, so no client holds more than that
+    in memory waiting for a newline.
+
+    The task of a document that gets no commands for idle_timeout seconds finishes until the document gets more, and
+    close stops them all.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 64,
+        max_unacked: int = 16,
+        read_size: int = 64 * 1024,
+        idle_timeout: float | None = 60.0,
+        max_line_size: int = 1024 * 1024,
+    ) -> None:
+        self.queue_size = queue_size
+        self.max_unacked = max_unacked
+        self.read_size = read_size
+        self.max_line_size = max_line_size
+        self.idle_timeout = idle_timeout
+        self.workers: dict[str, DocumentWorker] = {}
+
+    def worker(self, document_id: str) -> DocumentWorker:
+        worker = self.workers.get(document_id)
+        if worker is None:
+            worker = self.workers[document_id] = DocumentWorker(self.queue_size, self.idle_timeout)
+        else:
+            worker.start()
+        return worker
+
+    async def close(self) -> None:
+        await asyncio.gather(*(worker.close() for worker in self.workers.values()))
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        unacked: asyncio.Queue[Pending | None] = asyncio.Queue(self.max_unacked)
+        acknowledging = asyncio.create_task(self.acknowledge(unacked, writer))
+        # The pieces of the line still waiting for its newline, only joined once it comes, so a long line is not
+        # copied again with every read
+        unfinished: list[bytes] = []
+        unfinished_size = 0
+        try:
+            while chunk := await reader.read(self.read_size):
+                end = chunk.rfind(b"\n")
+                if end >= 0:
+                    lines = b"".join([*unfinished, chunk[:end]]).split(b"\n")
+                    unfinished, unfinished_size = [], 0
+                    await unacked.put(await self.dispatch(lines))
+                    chunk = chunk[end + 1 :]
+                if chunk:
+                    unfinished.append(chunk)
+                    unfinished_size += len(chunk)
+                if unfinished_size > self.max_line_size:
+                    error = {"line": 0, "error": f"ValueError: Line longer than {self.max_line_size} bytes"}
+                    await unacked.put((1, [error], []))
+                    return
+            remainder = b"".join(unfinished)
+            if remainder.strip():
+                await unacked.put(await self.dispatch([remainder]))
+        finally:
+            await unacked.put(None)
+            await acknowledging
+            writer.close()
+
+    async def dispatch(self, lines: list[bytes]) -> Pending:
+        errors: list[dict] = []
+        items: dict[str, list[tuple[int, Command | None]]] = {}
+        for line_number, line in enumerate(lines):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                document_id = str(request["document"])
+                command = READ if request.get("read") else Command(**request["command"])
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append({"line": line_number, "error": f"{type(e).__name__}: {e}"})
+                continue
+            items.setdefault(document_id, []).append((line_number, command))
+
+        batches: list[tuple[str, Batch]] = []
+        for document_id, document_items in items.items():
+            batch = Batch(document_items)
+            # Waits here while the document is behind, which stops this client from being read
+            await self.worker(document_id).queue.put(batch)
+            batches.append((document_id, batch))
+        return len(lines), errors, batches
+
+    async def acknowledge(self, unacked: asyncio.Queue[Pending | None], writer: asyncio.StreamWriter) -> None:
+        connected = True
+        while (pending := await unacked.get()) is not None:
+            count, errors, batches = pending
+            documents: dict[str, dict[int, str]] = {}
+            for document_id, batch in batches:
+                batch_errors, state = await batch.done
+                errors.extend(batch_errors)
+                if state is not None:
+                    documents[document_id] = state
+            ack: dict = {"ack": count, "errors": sorted(errors, key=lambda error: error["line"])}
+            if documents:
+                ack["documents"] = documents
+            if not connected:
+                continue
+            try:
+                writer.write(json.dumps(ack).encode() + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                # Keep taking acknowledgements off the queue, so reading the rest of this client does not block
+                connected = False
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_path: str | None = None) -> asyncio.Server:
+        if unix_path is not None:
+            return await asyncio.start_unix_server(self.handle, unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def run_service(host: str = "127.0.0.1", port: int = 8765, unix_path: str | None = None) -> None:
+    service = CommandService()
+    server = await service.serve(host, port, unix_path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
@@ -0,0 +1,103 @@
+import json
+import random
+
+import pytest
+
+from .benchmark import generate_commands
+from .checkpoint import (
+    HEADER,
+    LogDigest,
+    TrackedHistory,
+    _encode,
+    checkpoint_position,
+    execute_with_checkpoints,
+    load_checkpoint,
+)
+from .command import command_applier, execute_commands
+from .history import DeltaHistory
+
+
+def test_resume_matches_full_replay(tmp_path):
+    commands = generate_commands(5_000, seed=1)
+    path = tmp_path / "log.ckpt"
+
+    def crash_after(count):
+        for index, command in enumerate(commands):
+            if index == count:
+                raise KeyboardInterrupt
+            yield command
+
+    with pytest.raises(KeyboardInterrupt):
+        execute_with_checkpoints(crash_after(3_456), path, interval=1_000)
+    assert checkpoint_position(path) == 3_000
+
+    assert execute_with_checkpoints(commands, path, interval=1_000) == execute_commands(commands)
+    history, position = load_checkpoint(path)
+    assert position == 5_000
+    assert history.document == execute_commands(commands)
+
+
+def test_history_state_round_trips_through_json():
+    commands = generate_commands(2_000, seed=3)
+    for stop in range(0, 2_000, 97):
+        history = DeltaHistory()
+        execute_commands(commands[:stop], history)
+
+        restored = DeltaHistory.from_state(json.loads(json.dumps(history.state())))
+
+        assert restored.state() == history.state()
+        assert execute_commands(commands[stop:], restored) == execute_commands(commands)
+
+
+def test_changes_carry_a_copy_of_the_history_along():
+    for seed in range(20):
+        rng = random.Random(seed)
+        history = TrackedHistory()
+        copy = TrackedHistory.from_state(history.state())
+        apply = command_applier()
+        for command in generate_commands(500, seed):
+            apply(history, command)
+            if rng.random() < 0.3:
+                copy.apply_changes(json.loads(json.dumps(history.changes())))
+                assert copy.state() == history.state()
+                assert list(copy.document) == list(history.document)
+
+
+def test_checkpoint_appends_changes_as_json_lines(tmp_path):
+    path = tmp_path / "log.ckpt"
+    commands = generate_commands(5_000, seed=1)
+    execute_with_checkpoints(commands, path, interval=100)
+
+    lines = path.read_bytes()[HEADER.size :].splitlines()
+    assert 1 < len(lines) < 50
+    assert set(json.loads(lines[-1].rsplit(b" ", 2)[0])) == {"changes"}
+    assert lines[-1].endswith(f" 5000 {digest_of(commands)}".encode())
+
+
+def test_an_unfinished_line_is_dropped(tmp_path):
+    path = tmp_path / "log.ckpt"
+    commands = generate_commands(3_000, seed=2)
+    execute_with_checkpoints(commands[:2_000], path, interval=500)
+    with open(path, "ab") as file:
+        file.write(b'{"changes":{"docum')
+
+    assert checkpoint_position(path) == 2_000
+    assert execute_with_checkpoints(commands, path, interval=500) == execute_commands(commands)
+    assert load_checkpoint(path)[1] == 3_000
+
+
+def test_checkpoint_rejects_another_log(tmp_path):
+    path = tmp_path / "log.ckpt"
+    execute_with_checkpoints(generate_commands(1_000, seed=1), path)
+
+    with pytest.raises(ValueError, match="The first 1000 commands of the log are not the ones checkpointed"):
+        execute_with_checkpoints(generate_commands(2_000, seed=2), path)
+    with pytest.raises(ValueError, match="The log has 500 commands, fewer than the 1000 checkpointed"):
+        execute_with_checkpoints(generate_commands(1_000, seed=1)[:500], path)
+
+
+def digest_of(commands):
+    log = LogDigest()
+    for command in commands:
+        log.update(_encode([command]))
+    return log.hexdigest()
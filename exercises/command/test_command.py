@@ -1,4 +1,8 @@
-from .command import execute_commands, Command
+import random
+
+from .benchmark import generate_commands
+from .command import execute_commands, iter_commits, Command
+from .history import DeltaHistory, PersistentHistory, SnapshotHistory
 
 
 def test_hello_universe():
@@ -28,3 +32,60 @@ def test_hello_universe():
     )
 
     assert outcome == {1: "Hello", 2: "Universe", 3: "!"}
+
+
+def test_delta_history_matches_snapshot_history():
+    kinds = ["insert", "update", "delete", "merge", "split", "move", "commit", "rollback", "undo"]
+    rng = random.Random(0)
+    for _ in range(2000):
+        commands = [
+            Command(
+                rng.choice(kinds),
+                id=rng.randrange(4),
+                value=rng.choice(["a", "b c", "d e f"]),
+                other_id=rng.randrange(4),
+            )
+            for _ in range(rng.randrange(1, 30))
+        ]
+        outcomes = []
+        for history in (SnapshotHistory(), DeltaHistory(), PersistentHistory()):
+            try:
+                outcomes.append(execute_commands(commands, history))
+            except IndexError:
+                outcomes.append(IndexError)
+        assert outcomes[0] == outcomes[1] == outcomes[2], commands
+
+
+def test_delta_history_stores_only_changes():
+    history = DeltaHistory()
+    execute_commands([Command("insert", id=i, value="x") for i in range(100)], history)
+    execute_commands([Command("update", id=0, value="y"), Command("undo")], history)
+
+    assert history.document[0] == "x"
+    assert all(len(delta) == 1 for delta in history._deltas)
+
+
+def test_iter_commits_yields_committed_documents():
+    commands = iter(
+        [
+            Command("insert", id=1, value="Hello"),
+            Command("commit"),
+            Command("insert", id=2, value="World"),
+            Command("rollback"),
+            Command("commit"),
+        ]
+    )
+
+    assert list(iter_commits(commands)) == [{1: "Hello"}, {1: "Hello"}]
+
+
+def test_generated_logs_execute_for_any_seed():
+    for seed in range(200):
+        execute_commands(generate_commands(2_000, seed))
+
+
+def test_generated_logs_can_bound_the_document():
+    commands = generate_commands(5_000, id_count=10)
+
+    assert {command.id for command in commands} <= {None, *range(10)}
+    assert execute_commands(commands, SnapshotHistory()) == execute_commands(commands)
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from .benchmark import generate_commands
+from .command import Command, execute_commands
+from .compiled import OPCODES, compile_commands, execute_compiled
+
+
+def test_compiled_matches_execute_commands():
+    commands = [
+        Command("insert", id=1, value="Hello"),
+        Command("insert", id=2, value="World"),
+        Command("update", id=2, value="Universe"),
+        Command("merge", id=1, other_id=2),
+        Command("commit"),
+        Command("insert", id=3, value="!"),
+        Command("move", id=3, other_id=4),
+        Command("undo"),
+        Command("split", id=1, other_id=2),
+        Command("delete", id=3),
+        Command("rollback"),
+        Command("insert", id=5, value="Hello"),
+    ]
+
+    compiled = compile_commands(commands)
+
+    assert len(compiled) == len(commands)
+    assert compiled.strings == ["Hello", "World", "Universe", "!"]
+    assert execute_compiled(compiled) == execute_commands(commands)
+
+
+def test_compiled_raises_the_same_errors():
+    with pytest.raises(AssertionError, match="Missing other id"):
+        execute_compiled(compile_commands([Command("merge", id=1)]))
+    with pytest.raises(ValueError, match="Unknown command: Command\\(command_kind='upsert'"):
+        execute_compiled(compile_commands([Command("upsert", id=1, value="Hello")]))
+
+
+def _outcome(execute, commands):
+    try:
+        return execute(commands)
+    except (AssertionError, IndexError, ValueError) as e:
+        return type(e), str(e)
+
+
+def _random_command(rng: random.Random) -> Command:
+    # Mostly well formed, with the odd missing field or unknown kind, and ids at both ends of the int64 range
+    kind = rng.choice(["upsert", *OPCODES]) if rng.random() < 0.01 else rng.choice(["insert", "insert", *OPCODES])
+    ids = [None] if rng.random() < 0.01 else [0, 1, 2, -1, -(2**63), 2**63 - 1]
+    values = [None] if rng.random() < 0.01 else ["a", "b c", "d e f"]
+    return Command(kind, id=rng.choice(ids), value=rng.choice(values), other_id=rng.choice(ids))
+
+
+def test_compiled_matches_execute_commands_on_random_logs():
+    for seed in range(500):
+        rng = random.Random(seed)
+        commands = [_random_command(rng) for _ in range(rng.randrange(1, 60))]
+
+        compiled = _outcome(lambda log: execute_compiled(compile_commands(log)), commands)
+        assert compiled == _outcome(execute_commands, commands), commands
+    for seed in range(20):
+        commands = generate_commands(2_000, seed)
+        assert execute_compiled(compile_commands(commands)) == execute_commands(commands)
+
+
+def test_compile_rejects_ids_out_of_the_int64_range():
+    with pytest.raises(ValueError, match="Ids must fit in an int64"):
+        compile_commands([Command("insert", id=2**63, value="Hello")])
+    with pytest.raises(ValueError, match="Ids must fit in an int64"):
+        compile_commands([Command("move", id=1, other_id=-(2**63) - 1)])
@@ -0,0 +1,29 @@
+import io
+
+from .command import Command
+from .jsonl import read_commands, run_input
+
+
+def test_read_commands_is_lazy():
+    def lines():
+        yield '{"command_kind": "insert", "id": 1, "value": "Hello"}\n'
+        yield "\n"
+        raise AssertionError("read past the first command")
+
+    commands = read_commands(lines())
+    assert next(commands) == Command("insert", id=1, value="Hello")
+
+
+def test_run_input_prints_every_commit():
+    log = io.StringIO(
+        '{"command_kind": "insert", "id": 1, "value": "Hello"}\n'
+        '{"command_kind": "commit"}\n'
+        '{"command_kind": "insert", "id": 2, "value": "World"}\n'
+        '{"command_kind": "merge", "id": 1, "other_id": 2}\n'
+        '{"command_kind": "commit"}\n'
+    )
+    output = io.StringIO()
+
+    run_input(log, output, commits=True)
+
+    assert output.getvalue() == '{"1": "Hello"}\n{"1": "Hello World"}\n'
@@ -0,0 +1,19 @@
+from .command import Command
+from .parallel import DocumentResult, execute_many
+
+
+def test_execute_many_keeps_order_and_isolates_errors():
+    streams = {
+        "b": [Command("insert", id=1, value="Hello")],
+        "a": [Command("insert", id=1)],
+        "c": iter([Command("insert", id=1, value="Hello"), Command("insert", id=2, value="World")]),
+        "d": [Command("unknown")],
+    }
+
+    results = execute_many(streams, max_workers=2, chunk_commands=1)
+
+    assert list(results) == ["b", "a", "c", "d"]
+    assert results["b"] == DocumentResult(document={1: "Hello"})
+    assert results["a"] == DocumentResult(error="AssertionError: Missing value")
+    assert results["c"] == DocumentResult(document={1: "Hello", 2: "World"})
+    assert results["d"].error.startswith("ValueError: Unknown command")
@@ -0,0 +1,74 @@
+import random
+
+from .command import Command, execute_commands
+from .compiled import compile_commands, execute_compiled
+from .history import PersistentHistory, SnapshotHistory
+from .persistent import PersistentMap
+
+
+class CollidingKey:
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+    def __hash__(self) -> int:
+        return self.value % 3
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+
+def test_persistent_map_matches_dict_in_every_version():
+    rng = random.Random(0)
+    # Hashes of -1 and -2 are the same, as are those of the colliding keys with the same value modulo 3
+    keys = [*range(-3, 2_000, 7), *(CollidingKey(value) for value in range(12))]
+    expected: dict = {}
+    versions = [(PersistentMap(), {})]
+    for _ in range(3_000):
+        key = rng.choice(keys)
+        version = versions[-1][0]
+        if key in expected and rng.random() < 0.4:
+            del expected[key]
+            version = version.delete(key)
+        else:
+            expected[key] = rng.random()
+            version = version.set(key, expected[key])
+        versions.append((version, dict(expected)))
+
+    for version, contents in versions[::50]:
+        assert len(version) == len(contents)
+        assert dict(version.items()) == contents
+        assert all(version[key] == value for key, value in contents.items())
+        assert all((key in version) == (key in contents) for key in keys)
+
+
+def test_persistent_history_keeps_every_commit():
+    commands = [
+        Command("insert", id=1, value="Hello"),
+        Command("commit"),
+        Command("insert", id=2, value="World"),
+        Command("merge", id=1, other_id=2),
+        Command("commit"),
+        Command("split", id=1, other_id=2),
+        Command("undo"),
+        # The undo leaves the document as the committed snapshot, so the delete changes that snapshot too
+        Command("delete", id=1),
+        Command("rollback"),
+        Command("commit"),
+    ]
+    history = PersistentHistory()
+
+    assert execute_commands(commands, history) == execute_commands(commands, SnapshotHistory()) == {}
+    assert history.commits == [{1: "Hello"}, {1: "Hello World"}, {}]
+    assert history.commits[0][1] == "Hello"
+
+
+def test_execute_commands_returns_a_dict_of_the_persistent_document():
+    commands = [Command("insert", id=1, value="Hello"), Command("commit")]
+    for execute in (execute_commands, lambda commands, history: execute_compiled(compile_commands(commands), history)):
+        history = PersistentHistory()
+        document = execute(commands, history)
+
+        assert type(document) is dict
+        assert document == {1: "Hello"}
+        history.document[2] = "World"
+        assert document == {1: "Hello"}
@@ -0,0 +1,25 @@
+from .command import Command, execute_commands
+from .rope import Rope
+
+
+def test_rope_splits_on_first_space():
+    rope = Rope(Rope(Rope("Hello", "big"), "wide world"), "!")
+
+    head, rest = rope.split(" ", 1)
+
+    assert str(rope) == "Hello big wide world !"
+    assert (head, str(rest)) == ("Hello", "big wide world !")
+    assert " " in rope
+
+
+def test_ropes_give_the_same_document():
+    commands = [Command("insert", id=0, value="a")]
+    for index in range(1, 50):
+        commands.append(Command("insert", id=index, value=f"w{index} x"))
+        commands.append(Command("merge", id=0, other_id=index))
+        if index % 7 == 0:
+            commands.append(Command("split", id=0, other_id=100 + index))
+            commands.append(Command("move", id=0, other_id=200 + index))
+            commands.append(Command("undo"))
+
+    assert execute_commands(commands, ropes=True) == execute_commands(commands)
@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+from .service import CommandService
+
+
+def test_service_applies_commands_per_document(tmp_path):
+    path = str(tmp_path / "service.sock")
+
+    async def scenario():
+        server = await CommandService().serve(unix_path=path)
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            requests = [
+                {"document": "a", "command": {"command_kind": "insert", "id": 1, "value": "Hello"}},
+                {"document": "b", "command": {"command_kind": "insert", "id": 1, "value": "World"}},
+                {"document": "a", "command": {"command_kind": "insert", "id": 2}},
+                {"document": "a", "command": {"command_kind": "insert", "id": 2, "value": "World"}},
+                {"document": "a", "command": {"command_kind": "merge", "id": 1, "other_id": 2}},
+                {"document": "a", "read": True},
+                {"document": "b", "read": True},
+            ]
+            writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+            await writer.drain()
+            writer.write_eof()
+            acks = [json.loads(line) async for line in reader]
+            writer.close()
+            return acks
+
+    acks = asyncio.run(scenario())
+
+    assert sum(ack["ack"] for ack in acks) == 7
+    assert [error["error"] for ack in acks for error in ack["errors"]] == ["AssertionError: Missing value"]
+    documents = {key: value for ack in acks for key, value in ack.get("documents", {}).items()}
+    assert documents == {"a": {"1": "Hello World"}, "b": {"1": "World"}}
+
+
+def test_idle_documents_stop_their_tasks_and_close_stops_the_rest(tmp_path):
+    path = str(tmp_path / "service.sock")
+
+    async def send(requests):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+        await writer.drain()
+        writer.write_eof()
+        acks = [json.loads(line) async for line in reader]
+        writer.close()
+        return acks
+
+    async def scenario():
+        service = CommandService(idle_timeout=0.01)
+        server = await service.serve(unix_path=path)
+        async with server:
+            await send([{"document": "a", "command": {"command_kind": "insert", "id": 1, "value": "Hello"}}])
+            await asyncio.sleep(0.1)
+            idle = service.workers["a"].task.done()
+            # From here on the tasks stay until closed
+            service.idle_timeout = service.workers["a"].idle_timeout = None
+            acks = await send([{"document": "a", "read": True}, {"document": "b", "read": True}])
+            await service.close()
+            closed = [worker.task.cancelled() for worker in service.workers.values()]
+        return idle, acks, closed
+
+    idle, acks, closed = asyncio.run(scenario())
+
+    assert idle
+    assert {key: value for ack in acks for key, value in ack["documents"].items()} == {"a": {"1": "Hello"}, "b": {}}
+    assert closed == [True, True]
+
+
+def test_a_line_too_long_is_refused_and_the_connection_closed(tmp_path):
+    path = str(tmp_path / "service.sock")
+
+    async def scenario():
+        server = await CommandService(max_line_size=1000, read_size=100).serve(unix_path=path)
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            command = {"document": "a", "command": {"command_kind": "insert", "id": 1, "value": "Hello"}}
+            writer.write(json.dumps(command).encode() + b"\n" + b"x" * 10_000)
+            await writer.drain()
+            # The service closes the connection without waiting for the rest of the line
+            acks = [json.loads(line) async for line in reader]
+            writer.close()
+            return acks
+
+    acks = asyncio.run(scenario())
+
+    assert acks[0] == {"ack": 1, "errors": []}
+    assert acks[-1] == {"ack": 1, "errors": [{"line": 0, "error": "ValueError: Line longer than 1000 bytes"}]}
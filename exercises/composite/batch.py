@@ -0,0 +1,73 @@
+from collections.abc import Iterable, Iterator
+
+from .cache import CheckCache
+from .rules import USER_RULES, RuleSet
+
+
+class ValidationResults:
+    """
+    The outcome of validate_many: one validity bit per record, and for each invalid record the mask of its failed
+    checks. Error messages are only rendered when they are asked for.
+    """
+
+    def __init__(self, rules: RuleSet) -> None:
+        self.rules = rules
+        self.valid = bytearray()
+        self.failed: dict[int, int] = {}
+        self._count = 0
+
+    def append(self, valid: bool, failed: int = 0) -> None:
+        index = self._count
+        if index % 8 == 0:
+            self.valid.append(0)
+        if valid:
+            self.valid[index >> 3] |= 1 << (index & 7)
+        else:
+            self.failed[index] = failed
+        self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def is_valid(self, index: int) -> bool:
+        if not 0 <= index < self._count:
+            raise IndexError("record index out of range")
+        return bool(self.valid[index >> 3] >> (index & 7) & 1)
+
+    def error(self, index: int) -> str:
+        if self.is_valid(index):
+            return ""
+        return self.rules.render(self.failed[index])
+
+    def __getitem__(self, index: int) -> tuple[bool, str]:
+        """
+        The same as validate would return for the record at index.
+        """
+        return self.is_valid(index), self.error(index)
+
+    def __iter__(self) -> Iterator[tuple[bool, str]]:
+        for index in range(self._count):
+            yield self[index]
+
+    def invalid(self) -> Iterator[int]:
+        return iter(self.failed)
+
+    @property
+    def valid_count(self) -> int:
+        return self._count - len(self.failed)
+
+
+def validate_many(
+    records: Iterable[dict[str, str]], rules: RuleSet = USER_RULES, cache: CheckCache | None = None
+) -> ValidationResults:
+    if cache is not None:
+        rules = cache.rules
+    results = ValidationResults(rules)
+    is_valid = rules.is_valid
+    failed = rules.failed
+    for user_data in records:
+        if is_valid(user_data):
+            results.append(True)
+        else:
+            results.append(False, failed(user_data))
+    return results
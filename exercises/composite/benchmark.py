@@ -0,0 +1,133 @@
+import random
+import string
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from .cache import CheckCache
+from .composite import evaluate, validate, validate_eagerly
+from .incremental import IncrementalValidator
+
+
+def federated_record(rng: random.Random) -> dict[str, str]:
+    return {"federation_provider": rng.choice(["foo", "bar"]), "federation_id": str(rng.randrange(10**9))}
+
+
+def login_record(rng: random.Random) -> dict[str, str]:
+    name = rng.choice(["Alice", "Bob", "Carol", "Dave", "Erin"])
+    return {
+        "user_id": "".join(rng.choices(string.ascii_lowercase, k=10)),
+        "password": "".join(rng.choices(string.ascii_letters, k=10)) + str(rng.randrange(10)) + "!",
+        "email": f"{name.lower()}{rng.randrange(1000)}@example.com",
+        "firstname": name,
+        "lastname": rng.choice(["Smith", "Jones", "Taylor"]),
+        "address1": f"{rng.randrange(1, 200)} High Street",
+        "postcode": rng.choice(["AB1 2CD", "EF3 4GH"]),
+    }
+
+
+def invalid_record(rng: random.Random) -> dict[str, str]:
+    record = login_record(rng)
+    record["password"] = "short"
+    record["email"] = "not an email"
+    record["federation_provider"] = "baz"
+    return record
+
+
+POPULATIONS: dict[str, Callable[[random.Random], dict[str, str]]] = {
+    "valid federated": federated_record,
+    "valid login": login_record,
+    "invalid": invalid_record,
+}
+
+
+def generate_records(count: int, population: str, seed: int = 0) -> list[dict[str, str]]:
+    rng = random.Random(seed)
+    return [POPULATIONS[population](rng) for _ in range(count)]
+
+
+def run_benchmark(count: int = 100_000):
+    validators: dict[str, Callable[[dict[str, str]], object]] = {
+        "validate_eagerly": validate_eagerly,
+        "validate": validate,
+        "evaluate().valid": lambda user_data: evaluate(user_data).valid,
+    }
+    for population in POPULATIONS:
+        records = generate_records(count, population)
+        for name, validator in validators.items():
+            start = time.perf_counter()
+            for user_data in records:
+                validator(user_data)
+            elapsed = time.perf_counter() - start
+            print(f"{population:<16} {name:<17} {count / elapsed:12.0f} records/s")
+
+
+def generate_skewed_records(count: int, distinct: int = 5_000, seed: int = 0) -> list[dict[str, str]]:
+    """
+    Login records whose property values follow a Zipf-like distribution: a few values are very common and there is
+    a long tail of rare ones, like postcodes or surnames in a real import.
+    """
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    pools = {
+        field: [record[field] for record in (login_record(rng) for _ in range(distinct))] for field in login_record(rng)
+    }
+    # Some of the tail is invalid, so the error path is exercised as well
+    pools["email"][distinct // 2 :] = ["not an email"] * (distinct - distinct // 2)
+    columns = {field: rng.choices(pool, weights, k=count) for field, pool in pools.items()}
+    return [{field: columns[field][index] for field in columns} for index in range(count)]
+
+
+def run_cache_benchmark(count: int = 100_000, maxsizes: tuple[int, ...] = (256, 4_096, 65_536)):
+    records = generate_skewed_records(count)
+
+    start = time.perf_counter()
+    for user_data in records:
+        validate(user_data)
+    print(f"{'no cache':<16} {count / (time.perf_counter() - start):12.0f} records/s")
+
+    for maxsize in maxsizes:
+        cache = CheckCache(maxsize=maxsize)
+        start = time.perf_counter()
+        for user_data in records:
+            validate(user_data, cache=cache)
+        elapsed = time.perf_counter() - start
+
+        # Tracing slows everything down, so the memory held by a full cache is measured on a separate run
+        tracemalloc.start()
+        traced = CheckCache(maxsize=maxsize)
+        for user_data in records:
+            validate(user_data, cache=traced)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{f'cache {maxsize}':<16} {count / elapsed:12.0f} records/s  {cache.hit_rate:6.1%} hits  "
+            f"{size / 1024 / 1024:8.2f} MiB held"
+        )
+
+
+def run_incremental_benchmark(repeat: int = 5_000):
+    """
+    Someone typing an email address into an otherwise filled in sign-up form, validated after every keystroke.
+    """
+    user_data = login_record(random.Random(0))
+    address = "alice@example.com"
+    edits = [("email", address[:length]) for length in range(1, len(address) + 1)] * repeat
+
+    start = time.perf_counter()
+    for field, value in edits:
+        user_data[field] = value
+        validate(user_data)
+    print(f"{'validate':<16} {len(edits) / (time.perf_counter() - start):12.0f} edits/s")
+
+    validator = IncrementalValidator(user_data)
+    start = time.perf_counter()
+    for field, value in edits:
+        validator.change(field, value)
+    print(f"{'incremental':<16} {len(edits) / (time.perf_counter() - start):12.0f} edits/s")
+
+
+if __name__ == "__main__":
+    run_benchmark()
+    run_cache_benchmark()
+    run_incremental_benchmark()
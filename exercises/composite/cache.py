@@ -0,0 +1,41 @@
+from functools import lru_cache
+
+from .rules import USER_RULES, Check, RuleSet
+
+
+class CheckCache:
+    """
+    Remembers which checks a property value passes, for the most recently used maxsize (property, value) pairs.
+
+    Bulk records repeat the same postcodes, names and providers over and over, so the checks on them only have to
+    run once. Pass the cache to validate or validate_many to use it.
+    """
+
+    def __init__(self, maxsize: int = 65_536, rules: RuleSet = USER_RULES) -> None:
+        self._checks: dict[str, list[Check]] = {}
+        for check in rules.checks:
+            self._checks.setdefault(check.field, []).append(check)
+        self.passes = lru_cache(maxsize=maxsize)(self._passes)
+        self.rules = RuleSet(rules.root, passes=self.passes)
+
+    def _passes(self, field: str, value: str) -> int:
+        passed = 0
+        for check in self._checks[field]:
+            if check.predicate(value):
+                passed |= check.bit
+        return passed
+
+    def info(self):
+        """
+        Hits, misses, maximum size and current size of the cache.
+        """
+        return self.passes.cache_info()
+
+    @property
+    def hit_rate(self) -> float:
+        info = self.info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        self.passes.cache_clear()
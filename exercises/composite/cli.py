@@ -0,0 +1,30 @@
+import click
+
+from . import run_example
+from .stream import read_records, validate_stream
+
+
+@click.command(name="composite", help="Composite exercise example")
+@click.option("--input", "input_file", type=click.File("r"), help="JSONL or CSV user records to validate")
+@click.option(
+    "--format",
+    "input_format",
+    type=click.Choice(["jsonl", "csv"]),
+    help="Format of the input, guessed from its extension by default",
+)
+@click.option("--workers", type=int, help="Worker processes, one per core by default")
+@click.option("--chunk-size", default=10_000, show_default=True, help="Records sent to a worker at a time")
+def composite_cli(input_file, input_format, workers, chunk_size):
+    if input_file is None:
+        run_example()
+        return
+    if input_format is None:
+        input_format = "csv" if input_file.name.endswith(".csv") else "jsonl"
+    summary = validate_stream(
+        read_records(input_file, input_format),
+        click.get_text_stream("stdout"),
+        max_workers=workers,
+        chunk_size=chunk_size,
+    )
+    for line in summary.lines():
+        click.echo(line, err=True)
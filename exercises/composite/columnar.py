@@ -0,0 +1,75 @@
+import sys
+from array import array
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+
+from .rules import USER_RULES, AllOf, Check, Rule, RuleSet
+
+
+@dataclass
+class ColumnarResult:
+    """
+    valid holds one byte per row, 1 if the row is valid. error_codes holds the mask of failed checks for each row,
+    which RuleSet.render turns into the message validate would give for an invalid row.
+    """
+
+    rules: RuleSet
+    valid: bytes
+    error_codes: array
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def error(self, row: int) -> str:
+        return "" if self.valid[row] else self.rules.render(self.error_codes[row])
+
+
+def _passes(check: Check, column: Sequence[str | None] | None, rows: int) -> int:
+    """
+    Row i passing the check sets byte i of the result to 1. The check runs once per distinct value in the column.
+    """
+    if column is None:
+        return 0
+    outcomes = {value: value is not None and check.predicate(value) for value in set(column)}
+    return int.from_bytes(bytes(map(outcomes.__getitem__, column)), "little")
+
+
+def _combine(rule: Rule, passes: dict[Check, int]) -> int:
+    if isinstance(rule, Check):
+        return passes[rule]
+    combined = [_combine(child, passes) for child in rule.rules]
+    result = combined[0]
+    for other in combined[1:]:
+        result = result & other if isinstance(rule, AllOf) else result | other
+    return result
+
+
+def validate_columns(columns: Mapping[str, Sequence[str | None]], rules: RuleSet = USER_RULES) -> ColumnarResult:
+    """
+    Validates rows given as one sequence per property, with None where a row does not have the property.
+    Properties without a column are missing from every row.
+    """
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns must all have the same length, got {sorted(lengths)}")
+    rows = lengths.pop() if lengths else 0
+    assert len(rules.checks) <= 32, "Error codes only have room for 32 checks"
+
+    # Every row is a byte in these integers, so one & or | combines a whole column at once
+    passes = {check: _passes(check, columns.get(check.field), rows) for check in rules.checks}
+    valid = _combine(rules.root, passes).to_bytes(rows, "little")
+
+    ones = int.from_bytes(b"\x01" * rows, "little")
+    code_bytes = bytearray(4 * rows)
+    for lane in range(4):
+        lane_checks = rules.checks[8 * lane : 8 * lane + 8]
+        lane_codes = 0
+        for shift, check in enumerate(lane_checks):
+            lane_codes |= (passes[check] ^ ones) << shift
+        code_bytes[lane::4] = lane_codes.to_bytes(rows, "little")
+    error_codes = array("I")
+    error_codes.frombytes(code_bytes)
+    if sys.byteorder == "big":
+        error_codes.byteswap()
+
+    return ColumnarResult(rules, valid, error_codes)
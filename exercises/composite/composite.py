@@ -1,7 +1,47 @@
 import re
+from functools import cached_property
 
+from .cache import CheckCache
+from .rules import USER_RULES, Lines, RuleSet
 
-def validate(user_data: dict[str, str]) -> tuple[bool, str]:
+
+class ValidationResult:
+    """
+    Whether a record is valid, found by stopping at the first group that decides it.
+    The failed checks and the error message are only worked out when they are first asked for.
+    """
+
+    def __init__(self, user_data: dict[str, str], rules: RuleSet = USER_RULES) -> None:
+        self.user_data = user_data
+        self.rules = rules
+        self.valid = rules.is_valid(user_data)
+
+    @cached_property
+    def failed(self) -> int:
+        return 0 if self.valid else self.rules.failed(self.user_data)
+
+    @cached_property
+    def lines(self) -> Lines:
+        return self.rules.root.lines(self.failed, 0)
+
+    @cached_property
+    def message(self) -> str:
+        return "" if self.valid else self.rules.render(self.failed)
+
+
+def evaluate(user_data: dict[str, str]) -> ValidationResult:
+    return ValidationResult(user_data)
+
+
+def validate(user_data: dict[str, str], cache: CheckCache | None = None) -> tuple[bool, str]:
+    rules = USER_RULES if cache is None else cache.rules
+    return rules.validate(user_data)
+
+
+def validate_eagerly(user_data: dict[str, str]) -> tuple[bool, str]:
+    """
+    The original validate, which runs every check and builds the message before deciding. Kept as a reference.
+    """
     federation_errors: list[str] = []
     if "federation_provider" not in user_data or user_data["federation_provider"] not in ["foo", "bar"]:
         federation_errors.append("Property 'federation_provider' must be one of 'foo' or 'bar'")
@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.fixture
+def records() -> list[dict[str, str]]:
+    """
+    A handful of user records, valid and invalid, shared by the tests of the exercise.
+    """
+    return [
+        {},
+        {"federation_provider": "foo", "federation_id": "abc"},
+        {"federation_provider": "baz", "federation_id": "abc"},
+        {
+            "user_id": "user12345",
+            "password": "password1!",
+            "email": "user@example.com",
+            "firstname": "John",
+            "lastname": "Smith",
+            "address2": "1 Street",
+            "postcode": "AB1 2CD",
+        },
+        {
+            "user_id": "user12345",
+            "password": "password",
+            "email": "not an email",
+            "phone": "12345678",
+            "username": "bad name",
+            "firstname": "john",
+            "lastname": "Smith",
+            "address1": "",
+            "postcode": "AB1 2CD",
+        },
+    ]
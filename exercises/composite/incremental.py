@@ -0,0 +1,98 @@
+from .rules import USER_RULES, AllOf, AnyOf, Check, Lines, Rule, RuleSet
+
+
+class IncrementalValidator:
+    """
+    Holds the evaluated rule tree for one record that is edited a property at a time, as in a sign-up form.
+
+    A change to a property re-runs only the checks on that property, and only the groups above a check whose outcome
+    changed are worked out again, from the check up to the root. valid and message always equal what validate would
+    give for the current record.
+    """
+
+    def __init__(self, user_data: dict[str, str] | None = None, rules: RuleSet = USER_RULES) -> None:
+        self.rules = rules
+        self.user_data: dict[str, str] = dict(user_data or {})
+
+        # The tree in preorder, so every node comes after its parent
+        self._nodes: list[Rule] = []
+        self._parents: list[int] = []
+        self._children: list[list[int]] = []
+        self._indents: list[int] = []
+        self._leaves: dict[str, list[int]] = {}
+        self._add(rules.root, -1, 0)
+
+        # The error lines of every node, empty if and only if the node is valid
+        self._lines: list[Lines] = [[] for _ in self._nodes]
+        self._message: str | None = None
+        self._update(set(range(len(self._nodes))))
+
+    def _add(self, rule: Rule, parent: int, indent: int) -> None:
+        index = len(self._nodes)
+        self._nodes.append(rule)
+        self._parents.append(parent)
+        self._children.append([])
+        self._indents.append(indent)
+        if parent >= 0:
+            self._children[parent].append(index)
+        if isinstance(rule, Check):
+            self._leaves.setdefault(rule.field, []).append(index)
+            return
+        inner = indent if isinstance(rule, AllOf) and rule.header is None else indent + 1
+        for child in rule.rules:
+            self._add(child, index, inner)
+
+    def _evaluate(self, index: int) -> Lines:
+        rule = self._nodes[index]
+        indent = self._indents[index]
+        if isinstance(rule, Check):
+            return [] if rule.is_valid(self.user_data) else [(indent, rule.message)]
+        child_lines = [self._lines[child] for child in self._children[index]]
+        if isinstance(rule, AnyOf) and not all(child_lines):
+            return []
+        lines = [line for lines in child_lines for line in lines]
+        if not lines or rule.header is None:
+            return lines
+        return [(indent, rule.header), *lines]
+
+    def _update(self, dirty: set[int]) -> None:
+        """
+        Works out the dirty nodes again, children before parents, and then the parents of any that changed.
+        """
+        while dirty:
+            index = max(dirty)
+            dirty.remove(index)
+            lines = self._evaluate(index)
+            if lines == self._lines[index]:
+                continue
+            self._lines[index] = lines
+            parent = self._parents[index]
+            if parent >= 0:
+                dirty.add(parent)
+            else:
+                self._message = None
+
+    def change(self, field: str, value: str | None) -> tuple[bool, str]:
+        """
+        Sets the property, or removes it if value is None, and returns what validate would for the changed record.
+        """
+        if value is None:
+            self.user_data.pop(field, None)
+        else:
+            self.user_data[field] = value
+        self._update(set(self._leaves.get(field, ())))
+        return self.result
+
+    @property
+    def valid(self) -> bool:
+        return not self._lines[0]
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            self._message = "\n".join(["\t" * indent + line for indent, line in self._lines[0]])
+        return self._message
+
+    @property
+    def result(self) -> tuple[bool, str]:
+        return self.valid, self.message
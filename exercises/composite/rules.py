@@ -0,0 +1,404 @@
+import re
+from collections.abc import Callable
+from functools import lru_cache
+from time import perf_counter
+
+from .. import instrumentation
+
+
+SPECIAL_CHARACTERS = "!\"£$%^&*()_+-=`¬|{}[]'#@~<>?,./]"
+USERNAME_CHARACTERS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z]+$")
+
+# Lines of an error message, with how many tabs each is indented by
+Lines = list[tuple[int, str]]
+
+
+class Check:
+    """
+    A single condition on one property. A missing property always fails the check.
+    """
+
+    def __init__(self, field: str, predicate: Callable[[str], bool], message: str) -> None:
+        self.field = field
+        self.predicate = predicate
+        self.message = message
+        # Set by RuleSet: this check's bit in a mask of failed checks
+        self.bit = 0
+
+    def is_valid(self, user_data: dict[str, str]) -> bool:
+        return self.field in user_data and self.predicate(user_data[self.field])
+
+    def failed(self, user_data: dict[str, str]) -> int:
+        return 0 if self.is_valid(user_data) else self.bit
+
+    def lines(self, failed: int, indent: int) -> Lines:
+        return [(indent, self.message)] if failed & self.bit else []
+
+    def checks(self) -> list["Check"]:
+        return [self]
+
+
+class AllOf:
+    """
+    Valid if all of its rules are valid. Its errors are listed under the header if it has one, otherwise they are
+    listed as if they belonged to the parent.
+    """
+
+    def __init__(self, name: str, rules: list["Rule"], header: str | None = None) -> None:
+        self.name = name
+        self.rules = rules
+        self.header = header
+
+    def is_valid(self, user_data: dict[str, str]) -> bool:
+        return all(rule.is_valid(user_data) for rule in self.rules)
+
+    def failed(self, user_data: dict[str, str]) -> int:
+        failed = 0
+        for rule in self.rules:
+            failed |= rule.failed(user_data)
+        return failed
+
+    def lines(self, failed: int, indent: int) -> Lines:
+        inner = indent if self.header is None else indent + 1
+        lines = [line for rule in self.rules for line in rule.lines(failed, inner)]
+        if not lines or self.header is None:
+            return lines
+        return [(indent, self.header), *lines]
+
+    def checks(self) -> list[Check]:
+        return [check for rule in self.rules for check in rule.checks()]
+
+
+class AnyOf:
+    """
+    Valid if at least one of its rules is valid. Its errors, all of them, are listed under the header.
+    """
+
+    def __init__(self, name: str, rules: list["Rule"], header: str) -> None:
+        self.name = name
+        self.rules = rules
+        self.header = header
+
+    def is_valid(self, user_data: dict[str, str]) -> bool:
+        return any(rule.is_valid(user_data) for rule in self.rules)
+
+    def failed(self, user_data: dict[str, str]) -> int:
+        failed = 0
+        for rule in self.rules:
+            failed |= rule.failed(user_data)
+        return failed
+
+    def lines(self, failed: int, indent: int) -> Lines:
+        rule_lines = [rule.lines(failed, indent + 1) for rule in self.rules]
+        if not all(rule_lines):
+            return []
+        return [(indent, self.header), *(line for lines in rule_lines for line in lines)]
+
+    def checks(self) -> list[Check]:
+        return [check for rule in self.rules for check in rule.checks()]
+
+
+Rule = Check | AllOf | AnyOf
+
+
+def length_between(minimum: int, maximum: int) -> Callable[[str], bool]:
+    return lambda value: minimum <= len(value) <= maximum
+
+
+def is_name(value: str) -> bool:
+    return len(value) >= 2 and value[0].isupper() and value[1:].islower()
+
+
+def _predicate(check: Check, passes: Callable[[str, str], int] | None) -> Callable[[str], bool]:
+    if passes is None:
+        return check.predicate
+    field, bit = check.field, check.bit
+    return lambda value: passes(field, value) & bit != 0
+
+
+def _is_valid(rule: Rule, passes: Callable[[str, str], int] | None) -> Callable[[dict[str, str]], bool]:
+    """
+    rule.is_valid as a closure, composed once over pre-bound (field, predicate) pairs for the checks of a group and
+    closures for the groups within it. Groups nested in a group of the same kind are merged into it, as they only
+    matter to the error message.
+    """
+    if isinstance(rule, Check):
+        rule = AllOf(rule.field, [rule])
+    kind = type(rule)
+    checks: list[tuple[str, Callable[[str], bool]]] = []
+    groups: list[Callable[[dict[str, str]], bool]] = []
+    rules = list(reversed(rule.rules))
+    while rules:
+        child = rules.pop()
+        if isinstance(child, Check):
+            checks.append((child.field, _predicate(child, passes)))
+        elif type(child) is kind:
+            rules.extend(reversed(child.rules))
+        else:
+            groups.append(_is_valid(child, passes))
+
+    if kind is AllOf:
+
+        def all_valid(user_data: dict[str, str]) -> bool:
+            for field, predicate in checks:
+                if field not in user_data or not predicate(user_data[field]):
+                    return False
+            for is_valid in groups:
+                if not is_valid(user_data):
+                    return False
+            return True
+
+        return all_valid
+
+    def any_valid(user_data: dict[str, str]) -> bool:
+        for field, predicate in checks:
+            if field in user_data and predicate(user_data[field]):
+                return True
+        for is_valid in groups:
+            if is_valid(user_data):
+                return True
+        return False
+
+    return any_valid
+
+
+def _failed(checks: list[Check], passes: Callable[[str, str], int] | None) -> Callable[[dict[str, str]], int]:
+    """
+    The mask of the checks a record fails, from a flat list of the checks rather than a walk of the tree.
+    """
+    if passes is not None:
+        # passes answers for all the checks on a field at once
+        fields: dict[str, int] = {}
+        for check in checks:
+            fields[check.field] = fields.get(check.field, 0) | check.bit
+        field_bits = list(fields.items())
+
+        def failed_cached(user_data: dict[str, str]) -> int:
+            failed = 0
+            for field, bits in field_bits:
+                if field in user_data:
+                    failed |= bits & ~passes(field, user_data[field])
+                else:
+                    failed |= bits
+            return failed
+
+        return failed_cached
+
+    bound = [(check.field, check.predicate, check.bit) for check in checks]
+
+    def failed(user_data: dict[str, str]) -> int:
+        failed = 0
+        for field, predicate, bit in bound:
+            if field not in user_data or not predicate(user_data[field]):
+                failed |= bit
+        return failed
+
+    return failed
+
+
+class RuleSet:
+    """
+    A rule tree with its checks numbered, so the outcome of every check for a record fits in one integer.
+
+    is_valid and failed give the same answers as the methods of the tree, but are composed into closures once, which
+    saves a method call and attribute lookups per rule for every record.
+
+    If passes is given, checks are not run directly. Instead passes(field, value) is asked for the bits of the checks
+    on that field the value passes, see CheckCache.
+    """
+
+    def __init__(self, root: Rule, passes: Callable[[str, str], int] | None = None) -> None:
+        self.root = root
+        self.checks = root.checks()
+        self.groups = self._groups()
+        for index, check in enumerate(self.checks):
+            check.bit = 1 << index
+
+        self.is_valid: Callable[[dict[str, str]], bool] = _is_valid(root, passes)
+        self.failed: Callable[[dict[str, str]], int] = _failed(self.checks, passes)
+        # The message only depends on which checks failed, and the same few combinations come up over and over
+        self.render: Callable[[int], str] = lru_cache(maxsize=4096)(self._render)
+
+    def _groups(self) -> list[AllOf | AnyOf]:
+        groups: list[AllOf | AnyOf] = []
+        rules: list[Rule] = [self.root]
+        while rules:
+            rule = rules.pop()
+            if not isinstance(rule, Check):
+                groups.append(rule)
+                rules.extend(reversed(rule.rules))
+        return groups
+
+    def group(self, name: str) -> AllOf | AnyOf:
+        for group in self.groups:
+            if group.name == name:
+                return group
+        raise KeyError(f"No rule group named {name!r}")
+
+    def _render(self, failed: int) -> str:
+        return "\n".join(["\t" * indent + line for indent, line in self.root.lines(failed, 0)])
+
+    def validate(self, user_data: dict[str, str]) -> tuple[bool, str]:
+        metrics = instrumentation.active
+        if metrics is not None:
+            return self._validate_measured(metrics, user_data)
+        if self.is_valid(user_data):
+            return True, ""
+        return False, self.render(self.failed(user_data))
+
+    def _validate_measured(self, metrics: instrumentation.Metrics, user_data: dict[str, str]) -> tuple[bool, str]:
+        """
+        validate, timed and counted by outcome. Every group is then checked on its own through the tree, to time it
+        and count it if it failed; a group's time includes the groups within it.
+        """
+        start = perf_counter()
+        valid = self.is_valid(user_data)
+        result = (True, "") if valid else (False, self.render(self.failed(user_data)))
+        outcome = "valid" if valid else "invalid"
+        metrics.observe("exercises_validation_seconds", "outcome", outcome, perf_counter() - start)
+        metrics.count("exercises_validations_total", "outcome", outcome)
+        for group in self.groups:
+            start = perf_counter()
+            group_valid = group.is_valid(user_data)
+            metrics.observe("exercises_rule_group_seconds", "group", group.name, perf_counter() - start)
+            if not group_valid:
+                metrics.count("exercises_rule_groups_failed_total", "group", group.name)
+        return result
+
+
+def address_line(field: str) -> Check:
+    return Check(field, length_between(1, 100), f"Property '{field}' must be between 1 and 100 characters long")
+
+
+def name(field: str) -> AllOf:
+    return AllOf(field, [Check(field, is_name, f"Property '{field}' must be a valid name")])
+
+
+USER_RULES = RuleSet(
+    AnyOf(
+        "user",
+        [
+            AllOf(
+                "federation",
+                [
+                    Check(
+                        "federation_provider",
+                        lambda value: value in ["foo", "bar"],
+                        "Property 'federation_provider' must be one of 'foo' or 'bar'",
+                    ),
+                    Check(
+                        "federation_id",
+                        length_between(1, 100),
+                        "Property 'federation_id' must be between 1 and 100 characters long",
+                    ),
+                ],
+                header="All of the following federation errors must be fixed:",
+            ),
+            AllOf(
+                "login",
+                [
+                    AllOf(
+                        "user_id",
+                        [
+                            Check(
+                                "user_id",
+                                length_between(8, 12),
+                                "Property 'user_id' must be between 8 and 12 characters long",
+                            )
+                        ],
+                    ),
+                    AllOf(
+                        "password",
+                        [
+                            Check(
+                                "password",
+                                lambda value: len(value) >= 8,
+                                "Property 'password' must be at least 8 characters long",
+                            ),
+                            Check(
+                                "password",
+                                lambda value: any(c.isdigit() for c in value),
+                                "Property 'password' must contain a digit",
+                            ),
+                            Check(
+                                "password",
+                                lambda value: any(c in SPECIAL_CHARACTERS for c in value),
+                                "Property 'password' must contain a special character",
+                            ),
+                        ],
+                        header="All of the following password errors must be fixed:",
+                    ),
+                    AnyOf(
+                        "user_contact",
+                        [
+                            AllOf(
+                                "email",
+                                [
+                                    Check(
+                                        "email",
+                                        lambda value: EMAIL_PATTERN.match(value) is not None,
+                                        "Property 'email' must be a valid email address",
+                                    )
+                                ],
+                            ),
+                            AllOf(
+                                "non_email",
+                                [
+                                    AllOf(
+                                        "phone",
+                                        [
+                                            Check(
+                                                "phone",
+                                                length_between(8, 10),
+                                                "Property 'phone' must be between 8 and 10 characters long",
+                                            ),
+                                            Check("phone", str.isdigit, "Property 'phone' must be only digits"),
+                                        ],
+                                    ),
+                                    AllOf(
+                                        "username",
+                                        [
+                                            Check(
+                                                "username",
+                                                length_between(3, 20),
+                                                "Property 'username' must be between 3 and 20 characters long",
+                                            ),
+                                            Check(
+                                                "username",
+                                                lambda value: USERNAME_CHARACTERS.issuperset(value),
+                                                "Property 'username' must only contain alphanumerical characters "
+                                                "or underscores",
+                                            ),
+                                        ],
+                                    ),
+                                ],
+                                header="All of the following non-email login errors must be fixed:",
+                            ),
+                        ],
+                        header="At least one of the following user contact errors must be fixed:",
+                    ),
+                    name("firstname"),
+                    name("lastname"),
+                    AnyOf(
+                        "address",
+                        [address_line("address1"), address_line("address2")],
+                        header="At least one of the following address errors must be fixed:",
+                    ),
+                    AllOf(
+                        "postcode",
+                        [
+                            Check(
+                                "postcode",
+                                length_between(1, 10),
+                                "Property 'postcode' must be between 1 and 10 characters long",
+                            )
+                        ],
+                    ),
+                ],
+                header="All of the following login errors must be fixed:",
+            ),
+        ],
+        header="At least one of the following user errors must be fixed:",
+    )
+)
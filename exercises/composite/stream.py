@@ -0,0 +1,109 @@
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import TextIO
+
+from .. import instrumentation
+from ..pool import map_bounded
+from .rules import USER_RULES
+
+
+SUMMARY_GROUPS = ["federation", "password", "user_contact", "address"]
+
+
+@dataclass
+class Summary:
+    valid: int = 0
+    invalid: int = 0
+    # Group name to [valid, invalid] counts
+    groups: dict[str, list[int]] = field(default_factory=lambda: {name: [0, 0] for name in SUMMARY_GROUPS})
+    # The metrics collected while validating, when instrumentation is on
+    metrics: instrumentation.Metrics | None = None
+
+    def add(self, other: "Summary") -> None:
+        self.valid += other.valid
+        self.invalid += other.invalid
+        for name, (valid, invalid) in other.groups.items():
+            self.groups[name][0] += valid
+            self.groups[name][1] += invalid
+
+    def lines(self) -> list[str]:
+        lines = [f"Records: {self.valid + self.invalid}", f"Valid: {self.valid}", f"Invalid: {self.invalid}"]
+        for name, (valid, invalid) in self.groups.items():
+            lines.append(f"{name}: {valid} valid, {invalid} invalid")
+        return lines
+
+
+def read_records(input_file: TextIO, input_format: str) -> Iterator[dict[str, str]]:
+    """
+    Reads JSONL (one object per line) or CSV with a header row. CSV has no way to leave a property out but an empty
+    cell, so empty cells are dropped and validated as the missing properties they stand for.
+    """
+    if input_format == "csv":
+        for row in csv.DictReader(input_file):
+            yield {key: value for key, value in row.items() if key is not None and value}
+        return
+    for line in input_file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def validate_chunk(
+    start: int, records: list[dict[str, str]], measure: bool = False
+) -> tuple[list[tuple[int, str]], Summary]:
+    """
+    Validates the records numbered from start, returning the errors of the invalid ones in order and their counts.
+    With measure, the metrics of the chunk are collected on their own and returned in the summary, as a worker
+    process cannot add to the metrics of its parent.
+    """
+    if measure:
+        with instrumentation.collecting() as metrics:
+            failures, summary = validate_chunk(start, records)
+        summary.metrics = metrics
+        return failures, summary
+
+    groups = {name: USER_RULES.group(name) for name in SUMMARY_GROUPS}
+    failures: list[tuple[int, str]] = []
+    summary = Summary()
+    for index, user_data in enumerate(records, start):
+        valid, errors = USER_RULES.validate(user_data)
+        if valid:
+            summary.valid += 1
+        else:
+            summary.invalid += 1
+            failures.append((index, errors))
+        for name, group in groups.items():
+            summary.groups[name][0 if group.is_valid(user_data) else 1] += 1
+    return failures, summary
+
+
+def _chunks(records: Iterable[dict[str, str]], chunk_size: int) -> Iterator[tuple[int, list[dict[str, str]]]]:
+    iterator = iter(records)
+    start = 0
+    while chunk := list(islice(iterator, chunk_size)):
+        yield start, chunk
+        start += len(chunk)
+
+
+def validate_stream(
+    records: Iterable[dict[str, str]],
+    output: TextIO,
+    max_workers: int | None = None,
+    chunk_size: int = 10_000,
+) -> Summary:
+    """
+    Validates records over a process pool, writing every invalid record as a JSON line, {"record": <index>,
+    "errors": <message>}, in input order. At most two chunks per worker are held in memory at any time.
+    """
+    metrics = instrumentation.active
+    summary = Summary()
+    chunks = ((start, chunk, metrics is not None) for start, chunk in _chunks(records, chunk_size))
+    for failures, chunk_summary in map_bounded(validate_chunk, chunks, max_workers):
+        for index, errors in failures:
+            output.write(json.dumps({"record": index, "errors": errors}) + "\n")
+        summary.add(chunk_summary)
+        if metrics is not None and chunk_summary.metrics is not None:
+            metrics.add(chunk_summary.metrics)
+    return summary
@@ -0,0 +1,13 @@
+from .batch import validate_many
+from .composite import validate
+
+
+def test_validate_many_matches_validate(records):
+    results = validate_many(iter(records))
+
+    assert len(results) == len(records)
+    assert list(results) == [validate(record) for record in records]
+    assert [results.is_valid(index) for index in range(len(records))] == [False, True, False, True, False]
+    assert results.valid == bytearray([0b01010])
+    assert list(results.invalid()) == [0, 2, 4]
+    assert results.valid_count == 2
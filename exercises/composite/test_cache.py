@@ -0,0 +1,29 @@
+from .batch import validate_many
+from .cache import CheckCache
+from .composite import validate
+
+
+def test_cached_validate_matches_validate(records):
+    cache = CheckCache(maxsize=4)
+
+    for _ in range(3):
+        assert [validate(record, cache=cache) for record in records] == [validate(record) for record in records]
+    assert list(validate_many(records, cache=cache)) == [validate(record) for record in records]
+
+    info = cache.info()
+    assert info.currsize <= 4
+    assert info.hits > 0 and info.misses > 0
+    assert 0 < cache.hit_rate < 1
+
+
+def test_repeated_values_only_checked_once(records):
+    cache = CheckCache()
+    record = records[3]
+
+    validate(record, cache=cache)
+    misses = cache.info().misses
+    validate(dict(record), cache=cache)
+
+    assert cache.info().misses == misses
+    cache.clear()
+    assert cache.info().currsize == 0
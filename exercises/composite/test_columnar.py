@@ -0,0 +1,16 @@
+from .columnar import validate_columns
+from .composite import validate
+
+
+def test_validate_columns_matches_validate(records):
+    fields = sorted({field for record in records for field in record} | {"phone", "address1"})
+    columns = {field: [record.get(field) for record in records] for field in fields}
+    del columns["address1"]
+
+    result = validate_columns(columns)
+
+    assert len(result) == len(records)
+    assert [(bool(result.valid[row]), result.error(row)) for row in range(len(records))] == [
+        validate({key: value for key, value in record.items() if key != "address1"}) for record in records
+    ]
+    assert result.error_codes[1] != 0
@@ -1,4 +1,9 @@
-from .composite import validate
+import random
+
+from .benchmark import POPULATIONS, generate_records
+from .cache import CheckCache
+from .composite import evaluate, validate, validate_eagerly
+from .rules import USER_RULES
 
 
 def test_validate_empty():
@@ -32,3 +37,42 @@ At least one of the following user errors must be fixed:
 \t\tProperty 'postcode' must be between 1 and 10 characters long
 """.strip()
     )
+
+
+def test_validate_matches_validate_eagerly():
+    records = [
+        {},
+        {"federation_provider": "foo", "federation_id": "abc"},
+        {"federation_provider": "bar", "federation_id": "", "phone": "1234567a", "username": "ab"},
+        {"user_id": "user12345", "password": "p4ssword!", "phone": "12345678", "username": "user_1"},
+        {"email": "user@example.com", "address1": "1 Street", "address2": "", "firstname": "Ann", "lastname": "lee"},
+    ]
+    for record in records:
+        assert validate(record) == validate_eagerly(record)
+
+
+def test_evaluate_renders_errors_lazily():
+    result = evaluate({"federation_provider": "foo"})
+
+    assert not result.valid
+    assert "message" not in result.__dict__
+    assert result.lines[:2] == [
+        (0, "At least one of the following user errors must be fixed:"),
+        (1, "All of the following federation errors must be fixed:"),
+    ]
+    assert result.message == validate({"federation_provider": "foo"})[1]
+
+
+def test_rule_set_matches_the_tree():
+    rng = random.Random(0)
+    cached = CheckCache().rules
+    for population in POPULATIONS:
+        for record in generate_records(500, population, 0):
+            # Missing properties fail their checks
+            record = {field: value for field, value in record.items() if rng.random() > 0.2}
+            failed = 0
+            for check in USER_RULES.checks:
+                failed |= check.failed(record)
+            for rules in (USER_RULES, cached):
+                assert rules.is_valid(record) == USER_RULES.root.is_valid(record)
+                assert rules.failed(record) == failed
@@ -0,0 +1,48 @@
+from .composite import validate
+from .incremental import IncrementalValidator
+from .rules import AllOf, AnyOf, Check, RuleSet
+
+
+def test_starts_with_validate_result(records):
+    for record in records:
+        assert IncrementalValidator(record).result == validate(record)
+
+
+def test_changes_match_validate(records):
+    validator = IncrementalValidator()
+    user_data: dict[str, str] = {}
+    assert validator.result == validate(user_data)
+
+    for record in records[1:]:
+        for field, value in record.items():
+            user_data[field] = value
+            assert validator.change(field, value) == validate(user_data)
+    for field in list(user_data):
+        del user_data[field]
+        assert validator.change(field, None) == validate(user_data)
+    assert validator.user_data == {}
+
+
+def test_change_only_reruns_checks_on_the_field():
+    ran: list[str] = []
+
+    def check(field: str) -> Check:
+        return Check(field, lambda value: ran.append(field) or value != "", f"Property '{field}' must not be empty")
+
+    rules = RuleSet(AnyOf("root", [AllOf("ab", [check("a"), check("b")]), check("c")], header="One of:"))
+    first = rules.validate({"a": "", "b": "x"})
+    second = rules.validate({"a": "", "b": ""})
+    validator = IncrementalValidator({"a": "x", "b": "x"}, rules)
+    ran.clear()
+
+    assert validator.change("a", "") == first
+    assert ran == ["a"]
+    assert (
+        validator.change("b", "")
+        == second
+        == (
+            False,
+            "One of:\n\tProperty 'a' must not be empty\n\tProperty 'b' must not be empty\n\tProperty 'c' must not be empty",
+        )
+    )
+    assert ran == ["a", "b"]
@@ -0,0 +1,35 @@
+import io
+import json
+
+from .composite import validate
+from .stream import read_records, validate_stream
+
+
+def test_validate_stream_writes_failures_in_order(records):
+    output = io.StringIO()
+
+    summary = validate_stream(iter(records), output, max_workers=2, chunk_size=2)
+
+    failures = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failures == [
+        {"record": index, "errors": validate(record)[1]}
+        for index, record in enumerate(records)
+        if not validate(record)[0]
+    ]
+    assert (summary.valid, summary.invalid) == (2, 3)
+    assert summary.groups["federation"] == [1, 4]
+    assert summary.groups["user_contact"] == [1, 4]
+
+
+def test_read_records_from_csv():
+    records = read_records(io.StringIO("federation_provider,federation_id\nfoo,abc\nbar\n"), "csv")
+
+    assert list(records) == [{"federation_provider": "foo", "federation_id": "abc"}, {"federation_provider": "bar"}]
+
+
+def test_empty_csv_cells_are_validated_as_missing():
+    (record,) = read_records(io.StringIO("username,federation_provider\n,foo\n"), "csv")
+
+    assert record == {"federation_provider": "foo"}
+    assert validate(record) == validate({"federation_provider": "foo"})
+    assert "alphanumerical" in validate(record)[1]
@@ -0,0 +1,154 @@
+import json
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+
+# Upper bounds of the histogram buckets in seconds, from a microsecond for a single record up to a second for a batch
+BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 1e-2, 0.1, 1.0)
+FORMATS = ["prometheus", "json"]
+
+
+class Histogram:
+    def __init__(self) -> None:
+        # The observations in each bucket and not in any lower one, the last one for those above every bucket
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def add(self, other: "Histogram") -> None:
+        self.counts = [count + other_count for count, other_count in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def buckets(self) -> list[tuple[str, int]]:
+        """
+        The observations up to each bound, as Prometheus has them.
+        """
+        buckets = []
+        total = 0
+        for bound, count in zip([f"{bound:g}" for bound in BUCKETS] + ["+Inf"], self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metrics:
+    """
+    Counters and timing histograms of the hot paths, each with a single label, such as the kind of command.
+    """
+
+    def __init__(self) -> None:
+        self.counters: defaultdict[str, Counter[str]] = defaultdict(Counter)
+        self.histograms: defaultdict[str, dict[str, Histogram]] = defaultdict(dict)
+        # The name of the label of each metric
+        self.labels: dict[str, str] = {}
+
+    def count(self, name: str, label: str, value: str, amount: int = 1) -> None:
+        self.labels[name] = label
+        self.counters[name][value] += amount
+
+    def observe(self, name: str, label: str, value: str, seconds: float) -> None:
+        self.labels[name] = label
+        histograms = self.histograms[name]
+        histogram = histograms.get(value)
+        if histogram is None:
+            histogram = histograms[value] = Histogram()
+        histogram.observe(seconds)
+
+    def add(self, other: "Metrics") -> None:
+        """
+        Adds metrics collected elsewhere, such as in a worker process.
+        """
+        self.labels.update(other.labels)
+        for name, counter in other.counters.items():
+            self.counters[name].update(counter)
+        for name, histograms in other.histograms.items():
+            for value, histogram in histograms.items():
+                self.histograms[name].setdefault(value, Histogram()).add(histogram)
+
+    def prometheus(self) -> str:
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines: list[str] = []
+        for name, counter in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for value, count in sorted(counter.items()):
+                lines.append(f'{name}{{{self.labels[name]}="{_escape(value)}"}} {count}')
+        for name, histograms in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for value, histogram in sorted(histograms.items()):
+                label = f'{self.labels[name]}="{_escape(value)}"'
+                for bound, count in histogram.buckets():
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{label}}} {histogram.sum!r}")
+                lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return "".join(line + "\n" for line in lines)
+
+    def as_dict(self) -> dict:
+        return {
+            "counters": {
+                name: {"label": self.labels[name], "values": dict(sorted(counter.items()))}
+                for name, counter in sorted(self.counters.items())
+            },
+            "histograms": {
+                name: {
+                    "label": self.labels[name],
+                    "values": {
+                        value: {"buckets": dict(histogram.buckets()), "sum": histogram.sum, "count": histogram.count}
+                        for value, histogram in sorted(histograms.items())
+                    },
+                }
+                for name, histograms in sorted(self.histograms.items())
+            },
+        }
+
+    def render(self, metrics_format: str) -> str:
+        if metrics_format == "json":
+            return json.dumps(self.as_dict(), indent=2) + "\n"
+        return self.prometheus()
+
+
+# The metrics being collected, or None while instrumentation is off, as it is by default. The hot paths look this up
+# once per call, or once per loop, so leaving it off costs next to nothing.
+active: Metrics | None = None
+
+
+def enable() -> Metrics:
+    global active
+    if active is None:
+        active = Metrics()
+    return active
+
+
+def disable() -> Metrics | None:
+    """
+    Stops collecting, returning what was collected.
+    """
+    global active
+    collected, active = active, None
+    return collected
+
+
+@contextmanager
+def collecting() -> Iterator[Metrics]:
+    """
+    Collects into new metrics for the duration, then restores whatever was collecting before.
+    """
+    global active
+    previous, active = active, Metrics()
+    try:
+        yield active
+    finally:
+        active = previous
@@ -0,0 +1,24 @@
+import os
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any
+
+
+def map_bounded(
+    function: Callable[..., Any], arguments: Iterable[tuple], max_workers: int | None = None, ahead: int = 2
+) -> Iterator[Any]:
+    """
+    function(*args) for every args of arguments over a process pool, in order. At most ahead calls per worker are
+    waiting to be collected, so arguments are only read as the results are taken, and never held in memory as a
+    whole.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    in_flight: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for args in arguments:
+            if len(in_flight) >= max_workers * ahead:
+                yield in_flight.popleft().result()
+            in_flight.append(executor.submit(function, *args))
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import socket
+import threading
+from dataclasses import asdict
+
+import click
+
+from . import instrumentation
+from .command.command import Command, execute_commands
+from .composite.composite import validate
+from .strategy.strategy import LoanInfo, create_monthly_repayment
+
+
+# Longest request line accepted, as a command log is sent in a single line
+MAX_REQUEST = 64 * 1024 * 1024
+
+
+def _command(request: dict) -> dict:
+    return {"document": execute_commands(Command(**command) for command in request["commands"])}
+
+
+def _validate(request: dict) -> dict:
+    valid, errors = validate(request["user_data"])
+    return {"valid": valid, "errors": errors}
+
+
+def _repayment(request: dict) -> dict:
+    return asdict(create_monthly_repayment(LoanInfo(**request["loan"])))
+
+
+def _metrics(request: dict) -> dict:
+    metrics = instrumentation.active
+    return {"metrics": None if metrics is None else metrics.as_dict()}
+
+
+HANDLERS = {"command": _command, "validate": _validate, "repayment": _repayment, "metrics": _metrics}
+
+
+def respond(line: bytes) -> dict:
+    """
+    The response to one request, which is one of:
+        {"kind": "command", "commands": [{"command_kind": "insert", ...}, ...]} -> {"document": {...}}
+        {"kind": "validate", "user_data": {...}} -> {"valid": ..., "errors": ...}
+        {"kind": "repayment", "loan": {"loan_id": ..., ...}} -> {"loan_id": ..., "payment": ..., ...}
+        {"kind": "metrics"} -> {"metrics": ...}, None unless the server was started with --metrics
+    A bad request is answered with {"error": ...}, and the server carries on.
+    """
+    try:
+        request = json.loads(line)
+        return HANDLERS[request["kind"]](request)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while line := await reader.readline():
+            if line.strip():
+                writer.write(json.dumps(respond(line)).encode() + b"\n")
+                await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_server(path: str) -> asyncio.Server:
+    """
+    Answers newline-delimited JSON requests on a Unix socket, one response line per request line, in order. Clients
+    may send any number of requests over one connection without waiting for the responses.
+    """
+    return await asyncio.start_unix_server(handle, path, limit=MAX_REQUEST)
+
+
+async def run_server(path: str) -> None:
+    server = await start_server(path)
+    async with server:
+        await server.serve_forever()
+
+
+def call(path: str, requests: list[dict]) -> list[dict]:
+    """
+    Sends requests to the server listening on path over one connection, returning the responses in order. They are
+    sent from another thread, so a long list cannot fill both ends' buffers and leave each side waiting on the other.
+    """
+    with socket.socket(socket.AF_UNIX) as connection:
+        connection.connect(path)
+
+        def send() -> None:
+            connection.sendall(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+            connection.shutdown(socket.SHUT_WR)
+
+        sender = threading.Thread(target=send)
+        sender.start()
+        with connection.makefile("rb") as responses:
+            results = [json.loads(line) for line in responses]
+        sender.join()
+    return results
+
+
+@click.command(name="serve", help="Answer command, validation and repayment requests from a warm process")
+@click.option("--unix", "unix_path", required=True, help="Unix socket to listen on")
+def serve_cli(unix_path):
+    asyncio.run(run_server(unix_path))
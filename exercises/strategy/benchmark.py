@@ -0,0 +1,140 @@
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import replace
+
+from .cache import RepaymentCache
+from .portfolio import KINDS, Portfolio, create_monthly_repayments
+from .scenarios import evaluate_scenarios, scenario_grid, sweep
+from .schedule import iter_schedule, project_portfolio
+from .strategy import LoanInfo, MonthlyRepayment, create_monthly_repayment
+
+
+def generate_loans(count: int, seed: int = 0) -> list[LoanInfo]:
+    """
+    Loans of every kind, some of an unknown kind, at every stage of their duration.
+    """
+    rng = random.Random(seed)
+    kinds = [*KINDS, "legacy"]
+    loans: list[LoanInfo] = []
+    for index in range(count):
+        original_duration = rng.choice([12, 24, 36, 60, 120, 300])
+        loans.append(
+            LoanInfo(
+                loan_id=f"{index:08d}",
+                loan_kind=rng.choice(kinds),
+                original_duration=original_duration,
+                remaining_duration=rng.randint(1, original_duration),
+                interest=round(rng.uniform(1, 15), 2),
+                amount=round(rng.uniform(1_000, 500_000), 2),
+                current_credit_score=rng.randint(300, 900),
+                libor=round(rng.uniform(0, 5), 2),
+            )
+        )
+    return loans
+
+
+def measure(run: Callable[[], object]) -> tuple[float, int]:
+    """
+    Seconds taken by run, and its peak memory. Tracing slows everything down, so they are measured on separate runs.
+    """
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run_portfolio_benchmark(count: int = 1_000_000):
+    loans = generate_loans(count)
+    portfolio = Portfolio.from_loans(loans)
+    runs: dict[str, Callable[[], object]] = {
+        "scalar": lambda: [create_monthly_repayment(loan) for loan in loans],
+        "portfolio": lambda: create_monthly_repayments(portfolio),
+    }
+    for name, run in runs.items():
+        elapsed, peak = measure(run)
+        print(f"{name:<10} {count / elapsed:12.0f} loans/s  {peak / 1024 / 1024:8.1f} MiB peak")
+
+
+def feed_back(loan: LoanInfo) -> list[MonthlyRepayment]:
+    """
+    The schedule as it had to be worked out before, one create_monthly_repayment call per month.
+    """
+    repayments: list[MonthlyRepayment] = []
+    while loan.remaining_duration > 0:
+        repayment = create_monthly_repayment(loan)
+        repayments.append(repayment)
+        loan = replace(loan, amount=repayment.amount_remaining, remaining_duration=repayment.remaining_duration)
+    return repayments
+
+
+def run_schedule_benchmark(count: int = 1_000):
+    """
+    Full schedules of 30 year mortgages of every kind.
+    """
+    loans = [replace(loan, original_duration=360, remaining_duration=360) for loan in generate_loans(count)]
+    portfolio = Portfolio.from_loans(loans)
+    runs: dict[str, Callable[[], object]] = {
+        "feed back": lambda: [feed_back(loan) for loan in loans],
+        "iter_schedule": lambda: [list(iter_schedule(loan)) for loan in loans],
+        "project": lambda: project_portfolio(portfolio),
+    }
+    for name, run in runs.items():
+        elapsed, peak = measure(run)
+        print(f"{name:<14} {count * 360 / elapsed:12.0f} months/s  {peak / 1024 / 1024:8.1f} MiB peak")
+
+
+def run_scenario_benchmark(count: int = 100_000, max_workers: int | None = None):
+    """
+    20 libors by 20 credit score changes over the whole book.
+    """
+    portfolio = Portfolio.from_loans(generate_loans(count))
+    scenarios = scenario_grid([libor / 4 for libor in range(20)], range(-190, 10, 10))
+    runs: dict[str, Callable[[], object]] = {
+        "in process": lambda: evaluate_scenarios(portfolio, scenarios),
+        "sweep": lambda: sweep(portfolio, scenarios, max_workers),
+    }
+    for name, run in runs.items():
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {count * len(scenarios) / elapsed:12.0f} loan scenarios/s")
+
+
+def run_cache_benchmark(count: int = 1_000_000, months: int = 6, changes: float = 0.02):
+    """
+    Monthly runs where a share of the loans get a new libor and as many a new credit score.
+    """
+    rng = random.Random(0)
+    portfolio = Portfolio.from_loans(generate_loans(count))
+    cache = RepaymentCache()
+    cache.run(portfolio)
+    for month in range(1, months + 1):
+        for row in rng.sample(range(count), int(count * changes)):
+            portfolio.libors[row] = round(rng.uniform(0, 5), 2)
+        for row in rng.sample(range(count), int(count * changes)):
+            portfolio.credit_scores[row] = rng.randint(300, 900)
+        hits = sum(cache.hits.values())
+
+        start = time.perf_counter()
+        create_monthly_repayments(portfolio)
+        full = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.run(portfolio)
+        cached = time.perf_counter() - start
+        print(
+            f"month {month}: full {count / full:10.0f} loans/s  cached {count / cached:10.0f} loans/s  "
+            f"{(sum(cache.hits.values()) - hits) / count:6.1%} hits"
+        )
+
+
+if __name__ == "__main__":
+    run_portfolio_benchmark()
+    run_schedule_benchmark()
+    run_scenario_benchmark()
+    run_cache_benchmark()
@@ -0,0 +1,331 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from .portfolio import DEFAULT_KIND, KIND_CODES, Portfolio, create_monthly_repayments
+from .strategy import LoanInfo, MonthlyRepayment
+
+
+# File layout: magic, format version, number of rows and where the string tables start. The header is followed by
+# one fixed-width column after another, the 8 byte wide ones first, then padding to 8 bytes and the string tables.
+HEADER = struct.Struct("<4sB3xQQ")
+BOOK_MAGIC = b"LNBK"
+REPAYMENTS_MAGIC = b"LNRP"
+VERSION = 1
+
+# A loan book holds a kind table and a loan id table, and each loan refers to its kind and id by index
+BOOK_COLUMNS = [
+    ("original_durations", "q"),
+    ("remaining_durations", "q"),
+    ("interests", "d"),
+    ("amounts", "d"),
+    ("credit_scores", "q"),
+    ("libors", "d"),
+    ("kind_indexes", "I"),
+    ("loan_id_indexes", "I"),
+]
+# A repayments file holds a copy of the loan id table of the book it was worked out from
+REPAYMENT_COLUMNS = [
+    ("payments", "d"),
+    ("amounts_remaining", "d"),
+    ("remaining_durations", "q"),
+    ("loan_id_indexes", "I"),
+]
+
+
+def _align(offset: int) -> int:
+    return -(-offset // 8) * 8
+
+
+def _columns_size(columns: list[tuple[str, str]], rows: int) -> int:
+    return _align(HEADER.size + rows * sum(array(typecode).itemsize for _, typecode in columns))
+
+
+def pack_strings(strings: list[str]) -> bytes:
+    """
+    A string table: the number of strings and where each one starts and ends in the UTF-8 that follows.
+    """
+    encoded = [string.encode() for string in strings]
+    offsets = array("Q", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return struct.pack("<Q", len(encoded)) + offsets.tobytes() + b"".join(encoded)
+
+
+class StringTable:
+    """
+    A string table read straight from a buffer. Strings are decoded when they are asked for.
+    """
+
+    def __init__(self, view: memoryview) -> None:
+        (count,) = struct.unpack_from("<Q", view)
+        self.offsets = view[8 : 8 + 8 * (count + 1)].cast("Q")
+        self.data = view[8 + 8 * (count + 1) :]
+        self.size = 8 + 8 * (count + 1) + self.offsets[count]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        return str(self.data[self.offsets[index] : self.offsets[index + 1]], "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def release(self) -> None:
+        self.offsets.release()
+        self.data.release()
+
+
+class _MappedFile:
+    """
+    A file of this format mapped into memory, with its columns as memoryviews of the mapping. Nothing is copied
+    until it is read.
+    """
+
+    magic: bytes
+    columns: list[tuple[str, str]]
+    table_count: int
+
+    def __init__(self, path: Path) -> None:
+        if sys.byteorder != "little":
+            raise NotImplementedError("Mapped files can only be read on little-endian machines")
+        self._file = open(path, "rb")
+        self._mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.rows, tables_offset = HEADER.unpack_from(self._mapped)
+        if magic != self.magic or version != VERSION:
+            self._mapped.close()
+            self._file.close()
+            raise ValueError(f"Not a {type(self).__name__} file: {path}")
+        self._view = memoryview(self._mapped)
+
+        self._views: list[memoryview] = []
+        offset = HEADER.size
+        for name, typecode in self.columns:
+            size = self.rows * array(typecode).itemsize
+            view = self._view[offset : offset + size].cast(typecode)
+            self._views.append(view)
+            setattr(self, name, view)
+            offset += size
+
+        self.tables: list[StringTable] = []
+        self._table_offsets: list[int] = []
+        for _ in range(self.table_count):
+            table = StringTable(self._view[tables_offset:])
+            self.tables.append(table)
+            self._table_offsets.append(tables_offset)
+            tables_offset = _align(tables_offset + table.size)
+
+    def table_bytes(self, index: int) -> memoryview:
+        """
+        The string table as it is stored, to be copied into another file as it is.
+        """
+        offset = self._table_offsets[index]
+        return self._view[offset : offset + self.tables[index].size]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def close(self) -> None:
+        """
+        Raises BufferError if views taken from the file, such as a Portfolio, are still alive. The file is closed
+        either way, and the mapping goes once the last of those views does.
+        """
+        try:
+            for table in self.tables:
+                table.release()
+            for view in self._views:
+                view.release()
+            self._view.release()
+        finally:
+            try:
+                self._mapped.close()
+            finally:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        try:
+            self.close()
+        except BufferError:
+            # Views held by the traceback of the error on its way out keep the mapping, which goes with them
+            if exc_type is None:
+                raise
+
+
+class LoanBook(_MappedFile):
+    magic = BOOK_MAGIC
+    columns = BOOK_COLUMNS
+    table_count = 2
+
+    original_durations: memoryview
+    remaining_durations: memoryview
+    interests: memoryview
+    amounts: memoryview
+    credit_scores: memoryview
+    libors: memoryview
+    kind_indexes: memoryview
+    loan_id_indexes: memoryview
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        self.kinds, self.loan_ids = self.tables
+        # From the book's kind indexes to Portfolio kind codes
+        self._kind_codes = bytes(KIND_CODES.get(kind, DEFAULT_KIND) for kind in self.kinds)
+
+    def portfolio(self, start: int = 0, stop: int | None = None) -> Portfolio:
+        """
+        The loans from start up to stop, without loan ids. The numeric columns are views of the mapped file; only
+        the kind codes are copied, at one byte per loan. The portfolio must not outlive the book, which cannot be
+        closed while it is alive.
+        """
+        rows = slice(start, stop)
+        return Portfolio(
+            kinds=array("B", map(self._kind_codes.__getitem__, self.kind_indexes[rows])),
+            original_durations=self.original_durations[rows],
+            remaining_durations=self.remaining_durations[rows],
+            interests=self.interests[rows],
+            amounts=self.amounts[rows],
+            credit_scores=self.credit_scores[rows],
+            libors=self.libors[rows],
+        )
+
+    def __getitem__(self, row: int) -> LoanInfo:
+        return LoanInfo(
+            loan_id=self.loan_ids[self.loan_id_indexes[row]],
+            loan_kind=self.kinds[self.kind_indexes[row]],
+            original_duration=self.original_durations[row],
+            remaining_duration=self.remaining_durations[row],
+            interest=self.interests[row],
+            amount=self.amounts[row],
+            current_credit_score=self.credit_scores[row],
+            libor=self.libors[row],
+        )
+
+    def __iter__(self) -> Iterator[LoanInfo]:
+        for row in range(self.rows):
+            yield self[row]
+
+
+class RepaymentsFile(_MappedFile):
+    magic = REPAYMENTS_MAGIC
+    columns = REPAYMENT_COLUMNS
+    table_count = 1
+
+    payments: memoryview
+    amounts_remaining: memoryview
+    remaining_durations: memoryview
+    loan_id_indexes: memoryview
+
+    def __init__(self, path: Path) -> None:
+        super().__init__(path)
+        (self.loan_ids,) = self.tables
+
+    def __getitem__(self, row: int) -> MonthlyRepayment:
+        return MonthlyRepayment(
+            loan_id=self.loan_ids[self.loan_id_indexes[row]],
+            payment=self.payments[row],
+            amount_remaining=self.amounts_remaining[row],
+            remaining_duration=self.remaining_durations[row],
+        )
+
+    def __iter__(self) -> Iterator[MonthlyRepayment]:
+        for row in range(self.rows):
+            yield self[row]
+
+
+def _write(path: Path, magic: bytes, rows: int, columns: list[bytes], tables: list[bytes]) -> None:
+    """
+    The file is replaced atomically, as checkpoints are.
+    """
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, "wb") as file:
+        tables_offset = _align(HEADER.size + sum(map(len, columns)))
+        file.write(HEADER.pack(magic, VERSION, rows, tables_offset))
+        file.writelines(columns)
+        for table in tables:
+            file.write(bytes(_align(file.tell()) - file.tell()))
+            file.write(table)
+    os.replace(temporary, path)
+
+
+def write_book(path: Path, loans: Iterable[LoanInfo]) -> None:
+    columns = {name: array(typecode) for name, typecode in BOOK_COLUMNS}
+    kinds: dict[str, int] = {}
+    loan_ids: dict[str, int] = {}
+    for loan in loans:
+        columns["original_durations"].append(loan.original_duration)
+        columns["remaining_durations"].append(loan.remaining_duration)
+        columns["interests"].append(loan.interest)
+        columns["amounts"].append(loan.amount)
+        columns["credit_scores"].append(loan.current_credit_score)
+        columns["libors"].append(loan.libor)
+        columns["kind_indexes"].append(kinds.setdefault(loan.loan_kind, len(kinds)))
+        columns["loan_id_indexes"].append(loan_ids.setdefault(loan.loan_id, len(loan_ids)))
+    if sys.byteorder != "little":
+        for column in columns.values():
+            column.byteswap()
+    _write(
+        path,
+        BOOK_MAGIC,
+        len(columns["amounts"]),
+        [column.tobytes() for column in columns.values()],
+        [pack_strings(list(kinds)), pack_strings(list(loan_ids))],
+    )
+
+
+def process_book(input_path: Path, output_path: Path, chunk_size: int = 100_000) -> int:
+    """
+    Works out the monthly repayment of every loan of a loan book into a repayments file, a chunk of loans at a
+    time, without creating a LoanInfo or MonthlyRepayment per loan. Returns the number of loans.
+    """
+    temporary = output_path.with_name(output_path.name + ".tmp")
+    with LoanBook(input_path) as book:
+        # Checked up front, so the error names the loan rather than a row of the chunk it is in
+        if 0 in book.remaining_durations:
+            row = book.remaining_durations.tolist().index(0)
+            raise ZeroDivisionError(f"Loan {book[row].loan_id!r} has no remaining duration")
+        try:
+            _write_repayments(book, temporary, chunk_size)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+    os.replace(temporary, output_path)
+    return book.rows
+
+
+def _write_repayments(book: LoanBook, path: Path, chunk_size: int) -> None:
+    rows = book.rows
+    tables_offset = _columns_size(REPAYMENT_COLUMNS, rows)
+    loan_ids = book.table_bytes(1)
+    columns: dict[str, memoryview] = {}
+    with open(path, "w+b") as file:
+        file.truncate(tables_offset + len(loan_ids))
+        with mmap.mmap(file.fileno(), 0) as mapped, memoryview(mapped) as output:
+            try:
+                HEADER.pack_into(output, 0, REPAYMENTS_MAGIC, VERSION, rows, tables_offset)
+                offset = HEADER.size
+                for name, typecode in REPAYMENT_COLUMNS:
+                    size = rows * array(typecode).itemsize
+                    columns[name] = output[offset : offset + size].cast(typecode)
+                    offset += size
+                columns["loan_id_indexes"][:] = book.loan_id_indexes
+                output[tables_offset:] = loan_ids
+
+                for start in range(0, rows, chunk_size):
+                    stop = min(start + chunk_size, rows)
+                    repayments = create_monthly_repayments(book.portfolio(start, stop))
+                    columns["payments"][start:stop] = repayments.payments
+                    columns["amounts_remaining"][start:stop] = repayments.amounts_remaining
+                    columns["remaining_durations"][start:stop] = repayments.remaining_durations
+            finally:
+                for column in columns.values():
+                    column.release()
+                loan_ids.release()
@@ -0,0 +1,113 @@
+from array import array
+from collections import Counter
+from itertools import compress
+from operator import ne
+
+from .portfolio import (
+    CREDIT_SCORE_THRESHOLDS,
+    LIBOR_KINDS,
+    OFFER_KINDS,
+    Portfolio,
+    Repayments,
+    create_monthly_repayments,
+    kind_name,
+)
+
+
+def _changed(old: array, new: array) -> list[int]:
+    # Comparing the bytes first is much quicker than comparing the numbers when nothing changed
+    if old.tobytes() == new.tobytes():
+        return []
+    return list(compress(range(len(new)), map(ne, old, new)))
+
+
+def changed_rows(previous: Portfolio, portfolio: Portfolio) -> list[int]:
+    """
+    The rows of portfolio whose repayment may differ from the one for the same row of previous, which must hold the
+    same loans of the same kinds. A libor only matters for the variable kinds, an original duration only for the
+    offers, and a credit score only for the credit score kinds, and only when it crosses the kind's threshold.
+    """
+    kinds = portfolio.kinds
+    rows = set(_changed(previous.amounts, portfolio.amounts))
+    rows.update(_changed(previous.interests, portfolio.interests))
+    rows.update(_changed(previous.remaining_durations, portfolio.remaining_durations))
+    rows.update(row for row in _changed(previous.libors, portfolio.libors) if kinds[row] in LIBOR_KINDS)
+    rows.update(
+        row for row in _changed(previous.original_durations, portfolio.original_durations) if kinds[row] in OFFER_KINDS
+    )
+    for row in _changed(previous.credit_scores, portfolio.credit_scores):
+        threshold = CREDIT_SCORE_THRESHOLDS.get(kinds[row])
+        if threshold is None:
+            continue
+        if (previous.credit_scores[row] >= threshold) != (portfolio.credit_scores[row] >= threshold):
+            rows.add(row)
+    return sorted(rows)
+
+
+class RepaymentCache:
+    """
+    Keeps the inputs and repayments of the last monthly run, so the next run only works out the loans whose relevant
+    inputs changed. The results are the same as create_monthly_repayments gives for the whole portfolio.
+
+    Runs are compared row by row, so they are expected to hold the same loans in the same order, as runs from one
+    loan book do. Any other run is worked out in full and becomes the new starting point.
+    """
+
+    def __init__(self) -> None:
+        self._portfolio: Portfolio | None = None
+        self._repayments: Repayments | None = None
+        # Loans per kind name that were reused, and that were worked out
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+    def run(self, portfolio: Portfolio) -> Repayments:
+        previous = self._portfolio
+        if (
+            previous is None
+            or self._repayments is None
+            or previous.loan_ids != portfolio.loan_ids
+            or previous.kinds.tobytes() != portfolio.kinds.tobytes()
+        ):
+            repayments = create_monthly_repayments(portfolio)
+            for code, count in Counter(portfolio.kinds).items():
+                self.misses[kind_name(code)] += count
+        else:
+            rows = changed_rows(previous, portfolio)
+            changed = create_monthly_repayments(portfolio.select(rows))
+            repayments = Repayments(
+                loan_ids=portfolio.loan_ids,
+                payments=array("d", self._repayments.payments),
+                amounts_remaining=array("d", self._repayments.amounts_remaining),
+                remaining_durations=array("q", self._repayments.remaining_durations),
+            )
+            for index, row in enumerate(rows):
+                repayments.payments[row] = changed.payments[index]
+                repayments.amounts_remaining[row] = changed.amounts_remaining[index]
+                repayments.remaining_durations[row] = changed.remaining_durations[index]
+            misses = Counter(map(portfolio.kinds.__getitem__, rows))
+            for code, count in Counter(portfolio.kinds).items():
+                self.misses[kind_name(code)] += misses[code]
+                self.hits[kind_name(code)] += count - misses[code]
+
+        # A copy, so the next run can be compared with this one even if the caller changes the portfolio in place
+        self._portfolio = portfolio.copy()
+        self._repayments = repayments
+        return repayments
+
+    @property
+    def hit_rate(self) -> float:
+        hits = sum(self.hits.values())
+        lookups = hits + sum(self.misses.values())
+        return hits / lookups if lookups else 0.0
+
+    def kind_hit_rates(self) -> dict[str, float]:
+        return {
+            kind: self.hits[kind] / (self.hits[kind] + self.misses[kind])
+            for kind in sorted(self.hits.keys() | self.misses.keys())
+        }
+
+    def clear(self) -> None:
+        self._portfolio = None
+        self._repayments = None
+        self.hits.clear()
+        self.misses.clear()
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import click
+
+from . import run_example
+from .binary import process_book
+
+
+@click.command(name="strategy", help="Strategy exercise example")
+@click.option(
+    "--input",
+    "input_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Binary loan book to work out the monthly repayments of, instead of the example",
+)
+@click.option(
+    "--output",
+    "output_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Binary repayments file to write, required with --input",
+)
+@click.option("--chunk-size", default=100_000, show_default=True, help="Loans worked out at a time")
+def strategy_cli(input_path, output_path, chunk_size):
+    if input_path is None:
+        run_example()
+        return
+    if output_path is None:
+        raise click.UsageError("--output is required with --input")
+    loans = process_book(input_path, output_path, chunk_size)
+    click.echo(f"Loans: {loans}", err=True)
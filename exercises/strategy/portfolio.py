@@ -0,0 +1,370 @@
+from array import array
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from functools import cached_property
+from itertools import repeat
+from time import perf_counter
+
+from .. import instrumentation
+
+from .strategy import LoanInfo, MonthlyRepayment
+
+
+# How the loans of a kind are repaid. Every scheme pays the interest of the month, with the libor added for a
+# variable kind, on top of what is described here:
+# Only interest until the last month, which repays the whole amount
+INTEREST_ONLY = 0
+# An equal share of the amount each month
+INTEREST_AND_REPAYMENT = 1
+# Nothing is paid during the offer, though interest is added to the amount
+PAYMENT_HOLIDAY = 2
+# Only interest is paid during the offer
+INTEREST_ONLY_OFFER = 3
+# No interest is paid with a credit score of at least the threshold
+CREDIT_SCORE_DISCOUNT = 4
+# Interest is paid twice over with a credit score below the threshold, otherwise the repayment is deferred
+CREDIT_SCORE_PENALTY = 5
+
+
+@dataclass(frozen=True)
+class RepaymentRule:
+    """
+    The scheme a kind of loan is repaid by, and the details of it. Offers last for months from the start of the loan.
+    """
+
+    scheme: int
+    variable: bool = False
+    months: int = 0
+    threshold: int = 0
+
+
+# The one table of how each kind is repaid, for both create_monthly_repayments and the schedules. Kinds are stored
+# by their position in it, so new kinds go at the end.
+RULES: dict[str, RepaymentRule] = {
+    "interest_only": RepaymentRule(INTEREST_ONLY),
+    "interest_only_variable": RepaymentRule(INTEREST_ONLY, variable=True),
+    "interest_and_repayment": RepaymentRule(INTEREST_AND_REPAYMENT),
+    "v_interest_and_repayment": RepaymentRule(INTEREST_AND_REPAYMENT, variable=True),
+    "introductory_offer_3": RepaymentRule(PAYMENT_HOLIDAY, months=3),
+    "introductory_offer_12": RepaymentRule(PAYMENT_HOLIDAY, variable=True, months=12),
+    "introductory_offer_interest_only_6": RepaymentRule(INTEREST_ONLY_OFFER, months=6),
+    "introductory_offer_interest_only_9": RepaymentRule(INTEREST_ONLY_OFFER, months=9),
+    "good_credit_score": RepaymentRule(CREDIT_SCORE_DISCOUNT, threshold=700),
+    "very_good_credit_score": RepaymentRule(CREDIT_SCORE_DISCOUNT, variable=True, threshold=850),
+    "bad_credit_score": RepaymentRule(CREDIT_SCORE_PENALTY, threshold=650),
+    "very_bad_credit_score": RepaymentRule(CREDIT_SCORE_PENALTY, threshold=500),
+}
+KINDS = tuple(RULES)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+# Any other kind is repaid the default way, which is the same as interest_and_repayment
+DEFAULT_KIND = len(KINDS)
+RULE_CODES = {**{KIND_CODES[kind]: rule for kind, rule in RULES.items()}, DEFAULT_KIND: RULES["interest_and_repayment"]}
+
+
+# The kinds whose repayments depend on the libor
+LIBOR_KINDS = {code for code, rule in RULE_CODES.items() if rule.variable}
+# The kinds whose repayments depend on the original duration, through how long an offer lasts
+OFFER_KINDS = {code for code, rule in RULE_CODES.items() if rule.scheme in (PAYMENT_HOLIDAY, INTEREST_ONLY_OFFER)}
+# The kinds whose repayments depend on the credit score, only through which side of the threshold it is on
+CREDIT_SCORE_THRESHOLDS = {
+    code: rule.threshold
+    for code, rule in RULE_CODES.items()
+    if rule.scheme in (CREDIT_SCORE_DISCOUNT, CREDIT_SCORE_PENALTY)
+}
+
+
+def kind_name(code: int) -> str:
+    return KINDS[code] if code < DEFAULT_KIND else "default"
+
+
+def _typecode(column: array | memoryview) -> str:
+    return column.typecode if isinstance(column, array) else column.format
+
+
+@dataclass
+class Portfolio:
+    """
+    Loans stored column by column, with the kind of each loan as its index in KINDS, or DEFAULT_KIND.
+    Amounts, interests and libors are stored as doubles, as they are for LoanInfo in practice.
+    """
+
+    loan_ids: list[str] = field(default_factory=list)
+    kinds: array = field(default_factory=lambda: array("B"))
+    original_durations: array = field(default_factory=lambda: array("q"))
+    remaining_durations: array = field(default_factory=lambda: array("q"))
+    interests: array = field(default_factory=lambda: array("d"))
+    amounts: array = field(default_factory=lambda: array("d"))
+    credit_scores: array = field(default_factory=lambda: array("q"))
+    libors: array = field(default_factory=lambda: array("d"))
+    _kind_rows: dict[int, list[int]] | None = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_loans(cls, loans: Iterable[LoanInfo]) -> "Portfolio":
+        portfolio = cls()
+        for loan in loans:
+            portfolio.append(loan)
+        return portfolio
+
+    def append(self, loan: LoanInfo) -> None:
+        self.loan_ids.append(loan.loan_id)
+        self.kinds.append(KIND_CODES.get(loan.loan_kind, DEFAULT_KIND))
+        self.original_durations.append(loan.original_duration)
+        self.remaining_durations.append(loan.remaining_duration)
+        self.interests.append(loan.interest)
+        self.amounts.append(loan.amount)
+        self.credit_scores.append(loan.current_credit_score)
+        self.libors.append(loan.libor)
+        self._kind_rows = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def select(self, rows: list[int]) -> "Portfolio":
+        """
+        A new portfolio of the loans at rows, in that order.
+        """
+        return Portfolio(
+            [self.loan_ids[row] for row in rows],
+            *(array(_typecode(column), map(column.__getitem__, rows)) for column in self._columns()),
+        )
+
+    def copy(self) -> "Portfolio":
+        return Portfolio(list(self.loan_ids), *(array(_typecode(column), column) for column in self._columns()))
+
+    def _columns(self) -> list[array]:
+        return [
+            self.kinds,
+            self.original_durations,
+            self.remaining_durations,
+            self.interests,
+            self.amounts,
+            self.credit_scores,
+            self.libors,
+        ]
+
+    def kind_rows(self) -> dict[int, list[int]]:
+        """
+        The row numbers of the loans of each kind. They are worked out once and kept until a loan is appended, so
+        kinds must not be changed in place.
+        """
+        if self._kind_rows is None:
+            # Sorting the row numbers by kind puts the rows of each kind next to each other
+            order = sorted(range(len(self)), key=self.kinds.__getitem__)
+            counts = Counter(self.kinds)
+            self._kind_rows = {}
+            start = 0
+            for code in sorted(counts):
+                self._kind_rows[code] = order[start : start + counts[code]]
+                start += counts[code]
+        return self._kind_rows
+
+
+@dataclass
+class Repayments:
+    """
+    The monthly repayments for a Portfolio, column by column in the same order.
+    """
+
+    loan_ids: list[str]
+    payments: array
+    amounts_remaining: array
+    remaining_durations: array
+
+    def __len__(self) -> int:
+        return len(self.loan_ids)
+
+    def __getitem__(self, index: int) -> MonthlyRepayment:
+        return MonthlyRepayment(
+            loan_id=self.loan_ids[index],
+            payment=self.payments[index],
+            amount_remaining=self.amounts_remaining[index],
+            remaining_duration=self.remaining_durations[index],
+        )
+
+    def __iter__(self) -> Iterator[MonthlyRepayment]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+class Group:
+    """
+    The loans of one kind, which are all repaid by the same arithmetic. Only the columns the kind uses are gathered.
+    """
+
+    def __init__(self, portfolio: Portfolio, rows: list[int]) -> None:
+        self.portfolio = portfolio
+        self.rows = rows
+
+    def _gather(self, column: array) -> list:
+        return list(map(column.__getitem__, self.rows))
+
+    @cached_property
+    def amounts(self) -> list[float]:
+        return self._gather(self.portfolio.amounts)
+
+    @cached_property
+    def interests(self) -> list[float]:
+        return self._gather(self.portfolio.interests)
+
+    @cached_property
+    def libors(self) -> list[float]:
+        return self._gather(self.portfolio.libors)
+
+    @cached_property
+    def original_durations(self) -> list[int]:
+        return self._gather(self.portfolio.original_durations)
+
+    @cached_property
+    def remaining_durations(self) -> list[int]:
+        return self._gather(self.portfolio.remaining_durations)
+
+    @cached_property
+    def credit_scores(self) -> list[int]:
+        return self._gather(self.portfolio.credit_scores)
+
+    def interest_payments(self) -> list[float]:
+        return [amount * interest / 12 / 100 for amount, interest in zip(self.amounts, self.interests)]
+
+    def variable_interest_payments(self) -> list[float]:
+        return [
+            amount * (interest + libor) / 12 / 100
+            for amount, interest, libor in zip(self.amounts, self.interests, self.libors)
+        ]
+
+    def repayments(self) -> list[float]:
+        return [amount / remaining for amount, remaining in zip(self.amounts, self.remaining_durations)]
+
+    def durations_so_far(self) -> list[int]:
+        return [original - remaining for original, remaining in zip(self.original_durations, self.remaining_durations)]
+
+
+# Payments and amounts remaining, before rounding
+Columns = tuple[list[float], list[float]]
+
+
+def _interest_only(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    last = [remaining <= 1 for remaining in group.remaining_durations]
+    payments = [
+        interest + amount if is_last else interest
+        for interest, amount, is_last in zip(interest_payments, group.amounts, last)
+    ]
+    amounts_remaining = [0.0 if is_last else amount for amount, is_last in zip(group.amounts, last)]
+    return payments, amounts_remaining
+
+
+def _interest_and_repayment(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    repayments = group.repayments()
+    payments = [interest + repayment for interest, repayment in zip(interest_payments, repayments)]
+    amounts_remaining = [amount - repayment for amount, repayment in zip(group.amounts, repayments)]
+    return payments, amounts_remaining
+
+
+def _payment_holiday(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    repayments = group.repayments()
+    offer = [so_far < rule.months for so_far in group.durations_so_far()]
+    payments = [
+        0.0 if is_offer else interest + repayment
+        for interest, repayment, is_offer in zip(interest_payments, repayments, offer)
+    ]
+    amounts_remaining = [
+        amount + interest if is_offer else amount - repayment
+        for amount, interest, repayment, is_offer in zip(group.amounts, interest_payments, repayments, offer)
+    ]
+    return payments, amounts_remaining
+
+
+def _interest_only_offer(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    repayments = group.repayments()
+    offer = [so_far < rule.months for so_far in group.durations_so_far()]
+    payments = [
+        interest if is_offer else interest + repayment
+        for interest, repayment, is_offer in zip(interest_payments, repayments, offer)
+    ]
+    amounts_remaining = [
+        amount if is_offer else amount - repayment
+        for amount, repayment, is_offer in zip(group.amounts, repayments, offer)
+    ]
+    return payments, amounts_remaining
+
+
+def _credit_score_discount(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    repayments = group.repayments()
+    payments = [
+        repayment if score >= rule.threshold else interest + repayment
+        for interest, repayment, score in zip(interest_payments, repayments, group.credit_scores)
+    ]
+    amounts_remaining = [amount - repayment for amount, repayment in zip(group.amounts, repayments)]
+    return payments, amounts_remaining
+
+
+def _credit_score_penalty(rule: RepaymentRule, interest_payments: list[float], group: Group) -> Columns:
+    repayments = group.repayments()
+    below = [score < rule.threshold for score in group.credit_scores]
+    payments = [
+        interest * 2 + repayment if is_below else interest + repayment
+        for interest, repayment, is_below in zip(interest_payments, repayments, below)
+    ]
+    amounts_remaining = [
+        amount - repayment if is_below else amount + interest
+        for amount, interest, repayment, is_below in zip(group.amounts, interest_payments, repayments, below)
+    ]
+    return payments, amounts_remaining
+
+
+# The arithmetic of each scheme, a column at a time
+SCHEMES: dict[int, Callable[[RepaymentRule, list[float], Group], Columns]] = {
+    INTEREST_ONLY: _interest_only,
+    INTEREST_AND_REPAYMENT: _interest_and_repayment,
+    PAYMENT_HOLIDAY: _payment_holiday,
+    INTEREST_ONLY_OFFER: _interest_only_offer,
+    CREDIT_SCORE_DISCOUNT: _credit_score_discount,
+    CREDIT_SCORE_PENALTY: _credit_score_penalty,
+}
+
+
+def _strategy(rule: RepaymentRule) -> Callable[[Group], Columns]:
+    scheme = SCHEMES[rule.scheme]
+    interest_payments = Group.variable_interest_payments if rule.variable else Group.interest_payments
+    return lambda group: scheme(rule, interest_payments(group), group)
+
+
+# Keyed by kind code, DEFAULT_KIND included
+STRATEGIES: dict[int, Callable[[Group], Columns]] = {code: _strategy(rule) for code, rule in RULE_CODES.items()}
+
+
+def create_monthly_repayments(portfolio: Portfolio) -> Repayments:
+    """
+    The same repayments as create_monthly_repayment gives for each loan of the portfolio.
+
+    The loans are grouped by kind, and each group is worked out a column at a time with the arithmetic for its kind,
+    rather than a loan at a time. As with create_monthly_repayment, a loan with no remaining duration raises
+    ZeroDivisionError, whatever its kind.
+    """
+    if 0 in portfolio.remaining_durations:
+        index = list(portfolio.remaining_durations).index(0)
+        loan = repr(portfolio.loan_ids[index]) if portfolio.loan_ids else f"at row {index}"
+        raise ZeroDivisionError(f"Loan {loan} has no remaining duration")
+
+    metrics = instrumentation.active
+    count = len(portfolio)
+    payments = array("d", bytes(8 * count))
+    amounts_remaining = array("d", bytes(8 * count))
+    for code, rows in portfolio.kind_rows().items():
+        start = perf_counter()
+        group_payments, group_amounts_remaining = STRATEGIES[code](Group(portfolio, rows))
+        for row, payment, amount_remaining in zip(
+            rows, map(round, group_payments, repeat(4)), map(round, group_amounts_remaining, repeat(4))
+        ):
+            payments[row] = payment
+            amounts_remaining[row] = amount_remaining
+        if metrics is not None:
+            metrics.observe("exercises_repayment_group_seconds", "kind", kind_name(code), perf_counter() - start)
+            metrics.count("exercises_repayments_total", "kind", kind_name(code), len(rows))
+
+    return Repayments(
+        loan_ids=portfolio.loan_ids,
+        payments=payments,
+        amounts_remaining=amounts_remaining,
+        remaining_durations=array("q", [remaining - 1 for remaining in portfolio.remaining_durations]),
+    )
@@ -0,0 +1,185 @@
+import os
+from array import array
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import product, repeat
+from multiprocessing.shared_memory import SharedMemory
+from operator import mul
+
+from .portfolio import CREDIT_SCORE_THRESHOLDS, LIBOR_KINDS, STRATEGIES, Group, Portfolio, kind_name
+
+
+# The numeric columns of a Portfolio as they are laid out in shared memory, the widest first to keep them aligned
+SHARED_COLUMNS = [
+    ("original_durations", "q"),
+    ("remaining_durations", "q"),
+    ("interests", "d"),
+    ("amounts", "d"),
+    ("credit_scores", "q"),
+    ("libors", "d"),
+    ("kinds", "B"),
+]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """
+    The libor every loan pays, or None to keep each loan's own, and a change to every credit score.
+    """
+
+    libor: float | None = None
+    credit_score_change: int = 0
+
+
+def scenario_grid(libors: Iterable[float | None], credit_score_changes: Iterable[int]) -> list[Scenario]:
+    return [Scenario(libor, change) for libor, change in product(libors, credit_score_changes)]
+
+
+@dataclass
+class KindTotals:
+    """
+    Totals of the repayments of a number of loans. Payments and amounts remaining are summed after rounding, in
+    ten-thousandths, so the totals are exact and do not depend on the order the loans are added in.
+    """
+
+    loans: int = 0
+    payments: int = 0
+    amounts_remaining: int = 0
+
+    def add(self, other: "KindTotals") -> None:
+        self.loans += other.loans
+        self.payments += other.payments
+        self.amounts_remaining += other.amounts_remaining
+
+    @property
+    def payment_total(self) -> float:
+        return self.payments / 10_000
+
+    @property
+    def amount_remaining_total(self) -> float:
+        return self.amounts_remaining / 10_000
+
+
+@dataclass
+class ScenarioTotals:
+    scenario: Scenario
+    kinds: dict[str, KindTotals] = field(default_factory=dict)
+
+    @property
+    def total(self) -> KindTotals:
+        total = KindTotals()
+        for kind_totals in self.kinds.values():
+            total.add(kind_totals)
+        return total
+
+
+def _ten_thousandths(values: list[float]) -> int:
+    return sum(map(round, map(mul, map(round, values, repeat(4)), repeat(10_000))))
+
+
+def _group_totals(portfolio: Portfolio, code: int, rows: list[int], scenario: Scenario) -> KindTotals:
+    group = Group(portfolio, rows)
+    if scenario.libor is not None:
+        group.libors = [scenario.libor] * len(rows)
+    if scenario.credit_score_change:
+        group.credit_scores = [score + scenario.credit_score_change for score in group.credit_scores]
+    payments, amounts_remaining = STRATEGIES[code](group)
+    return KindTotals(len(rows), _ten_thousandths(payments), _ten_thousandths(amounts_remaining))
+
+
+def evaluate_scenarios(portfolio: Portfolio, scenarios: Iterable[Scenario]) -> list[ScenarioTotals]:
+    """
+    The totals per kind of the repayments create_monthly_repayment would give for every loan under each scenario.
+
+    A kind is only worked out again when the scenario changes something it depends on, so the kinds that depend on
+    neither the libor nor the credit score are worked out once.
+    """
+    kind_rows = portfolio.kind_rows()
+    worked_out: dict[tuple[int, float | None, int], KindTotals] = {}
+    results: list[ScenarioTotals] = []
+    for scenario in scenarios:
+        totals = ScenarioTotals(scenario)
+        for code, rows in kind_rows.items():
+            key = (
+                code,
+                scenario.libor if code in LIBOR_KINDS else None,
+                scenario.credit_score_change if code in CREDIT_SCORE_THRESHOLDS else 0,
+            )
+            if key not in worked_out:
+                worked_out[key] = _group_totals(portfolio, code, rows, Scenario(*key[1:]))
+            totals.kinds[kind_name(code)] = worked_out[key]
+        results.append(totals)
+    return results
+
+
+class SharedPortfolio:
+    """
+    A copy of the numeric columns of a portfolio in shared memory, for worker processes to read without copying.
+    It is removed when the context exits.
+    """
+
+    def __init__(self, portfolio: Portfolio) -> None:
+        self.count = len(portfolio)
+        columns = [getattr(portfolio, column).tobytes() for column, _ in SHARED_COLUMNS]
+        self.memory = SharedMemory(create=True, size=max(sum(map(len, columns)), 1))
+        offset = 0
+        for data in columns:
+            self.memory.buf[offset : offset + len(data)] = data
+            offset += len(data)
+
+    def __enter__(self) -> "SharedPortfolio":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.memory.close()
+        self.memory.unlink()
+
+
+def attach_portfolio(name: str, count: int) -> tuple[SharedMemory, Portfolio]:
+    """
+    A Portfolio whose columns are views of the shared memory of a SharedPortfolio. It has no loan ids.
+    """
+    memory = SharedMemory(name=name)
+    columns = {}
+    offset = 0
+    for column, typecode in SHARED_COLUMNS:
+        size = count * array(typecode).itemsize
+        columns[column] = memory.buf[offset : offset + size].cast(typecode)
+        offset += size
+    return memory, Portfolio(**columns)
+
+
+# The shared portfolio, in each worker process
+_shared: tuple[SharedMemory, Portfolio] | None = None
+
+
+def _attach(name: str, count: int) -> None:
+    global _shared
+    _shared = attach_portfolio(name, count)
+
+
+def _evaluate_chunk(scenarios: list[Scenario]) -> list[ScenarioTotals]:
+    assert _shared is not None, "The worker has not attached to the shared portfolio"
+    return evaluate_scenarios(_shared[1], scenarios)
+
+
+def sweep(portfolio: Portfolio, scenarios: Sequence[Scenario], max_workers: int | None = None) -> list[ScenarioTotals]:
+    """
+    evaluate_scenarios over a process pool, in the order of scenarios. The portfolio is put in shared memory once
+    and read by every worker, rather than sent to each of them.
+
+    Consecutive scenarios go to the same worker, so scenario_grid's scenarios for one libor are mostly worked out
+    together and share the kinds that only depend on the libor.
+    """
+    if 0 in portfolio.remaining_durations:
+        raise ZeroDivisionError("Every loan must have a remaining duration")
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(-(-len(scenarios) // (max_workers * 2)), 1)
+    chunks = [list(scenarios[start : start + chunk_size]) for start in range(0, len(scenarios), chunk_size)]
+
+    with SharedPortfolio(portfolio) as shared:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_attach, initargs=(shared.memory.name, shared.count)
+        ) as executor:
+            return [totals for chunk_totals in executor.map(_evaluate_chunk, chunks) for totals in chunk_totals]
@@ -0,0 +1,166 @@
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from .portfolio import (
+    CREDIT_SCORE_DISCOUNT,
+    CREDIT_SCORE_PENALTY,
+    DEFAULT_KIND,
+    INTEREST_ONLY,
+    INTEREST_ONLY_OFFER,
+    KIND_CODES,
+    PAYMENT_HOLIDAY,
+    RULE_CODES,
+    Portfolio,
+    RepaymentRule,
+)
+from .strategy import LoanInfo, MonthlyRepayment
+
+
+# Runs of identical months: how many, their payment and the amount remaining after each
+Run = tuple[int, float, float]
+
+
+def _month(
+    rule: RepaymentRule, amount: float, remaining: int, original: int, interest: float, libor: float, score: int
+) -> tuple[float, float]:
+    """
+    The payment and amount remaining create_monthly_repayment gives for the month, with the same arithmetic. The
+    rule is the kind's entry of the table create_monthly_repayments uses, worked out for a single loan.
+    """
+    if rule.variable:
+        interest_payment = amount * (interest + libor) / 12 / 100
+    else:
+        interest_payment = amount * interest / 12 / 100
+    repayment = amount / remaining
+    duration_so_far = original - remaining
+    scheme = rule.scheme
+    if scheme == INTEREST_ONLY:
+        return (interest_payment + amount, 0) if remaining <= 1 else (interest_payment, amount)
+    if scheme == PAYMENT_HOLIDAY and duration_so_far < rule.months:
+        return 0, amount + interest_payment
+    if scheme == INTEREST_ONLY_OFFER and duration_so_far < rule.months:
+        return interest_payment, amount
+    if scheme == CREDIT_SCORE_DISCOUNT and score >= rule.threshold:
+        return repayment, amount - repayment
+    if scheme == CREDIT_SCORE_PENALTY:
+        if score < rule.threshold:
+            return interest_payment * 2 + repayment, amount - repayment
+        return interest_payment + repayment, amount + interest_payment
+    return interest_payment + repayment, amount - repayment
+
+
+def _interest_only_until(rule: RepaymentRule, original: int) -> int:
+    """
+    The lowest remaining duration at which a loan of the kind still only pays interest, or 0 if it never does.
+    """
+    if rule.scheme == INTEREST_ONLY:
+        return 2
+    if rule.scheme == INTEREST_ONLY_OFFER:
+        return max(original - rule.months + 1, 1)
+    return 0
+
+
+def _runs(
+    code: int, amount: float, remaining: int, original: int, interest: float, libor: float, score: int
+) -> Iterator[Run]:
+    """
+    The schedule in runs of identical months. A month that only pays interest leaves the amount as it is, once it
+    has been rounded, so every month after it is the same until the interest only phase ends. Those are jumped over
+    in one run; every other month is worked out in turn, as the rounding of each month feeds into the next.
+    """
+    rule = RULE_CODES[code]
+    lowest = _interest_only_until(rule, original)
+    while remaining > 0:
+        payment, amount_remaining = _month(rule, amount, remaining, original, interest, libor, score)
+        payment, amount_remaining = round(payment, 4), round(amount_remaining, 4)
+        yield 1, payment, amount_remaining
+        if lowest and remaining >= lowest and amount_remaining == amount and remaining - lowest > 0:
+            yield remaining - lowest, payment, amount_remaining
+            remaining = lowest
+        amount = amount_remaining
+        remaining -= 1
+
+
+def iter_schedule(loan: LoanInfo) -> Iterator[MonthlyRepayment]:
+    """
+    The repayments of every remaining month of the loan, the same as feeding each repayment's amount and remaining
+    duration back into create_monthly_repayment until no months remain.
+    """
+    remaining = loan.remaining_duration
+    for count, payment, amount_remaining in _runs(
+        KIND_CODES.get(loan.loan_kind, DEFAULT_KIND),
+        loan.amount,
+        loan.remaining_duration,
+        loan.original_duration,
+        loan.interest,
+        loan.libor,
+        loan.current_credit_score,
+    ):
+        for _ in range(count):
+            remaining -= 1
+            yield MonthlyRepayment(loan.loan_id, payment, amount_remaining, remaining)
+
+
+@dataclass
+class Schedule:
+    """
+    The schedules of every loan of a Portfolio, one after the other. The months of loan i are the rows from
+    offsets[i] up to offsets[i + 1].
+    """
+
+    loan_ids: list[str]
+    offsets: array
+    payments: array
+    amounts_remaining: array
+    remaining_durations: array
+
+    def __len__(self) -> int:
+        return len(self.payments)
+
+    def loan(self, index: int) -> Iterator[MonthlyRepayment]:
+        loan_id = self.loan_ids[index]
+        for row in range(self.offsets[index], self.offsets[index + 1]):
+            yield MonthlyRepayment(
+                loan_id, self.payments[row], self.amounts_remaining[row], self.remaining_durations[row]
+            )
+
+    def __iter__(self) -> Iterator[MonthlyRepayment]:
+        for index in range(len(self.loan_ids)):
+            yield from self.loan(index)
+
+
+def project_portfolio(portfolio: Portfolio) -> Schedule:
+    """
+    The schedule of every loan of the portfolio, written into arrays allocated up front for all of the months.
+    """
+    offsets = array("q", [0])
+    for remaining in portfolio.remaining_durations:
+        offsets.append(offsets[-1] + max(remaining, 0))
+    rows = offsets[-1]
+    payments = array("d", bytes(8 * rows))
+    amounts_remaining = array("d", bytes(8 * rows))
+    remaining_durations = array("q", bytes(8 * rows))
+
+    for index in range(len(portfolio)):
+        row = offsets[index]
+        remaining = portfolio.remaining_durations[index]
+        remaining_durations[row : offsets[index + 1]] = array("q", range(remaining - 1, -1, -1))
+        for count, payment, amount_remaining in _runs(
+            portfolio.kinds[index],
+            portfolio.amounts[index],
+            remaining,
+            portfolio.original_durations[index],
+            portfolio.interests[index],
+            portfolio.libors[index],
+            portfolio.credit_scores[index],
+        ):
+            if count == 1:
+                payments[row] = payment
+                amounts_remaining[row] = amount_remaining
+            else:
+                payments[row : row + count] = array("d", [payment]) * count
+                amounts_remaining[row : row + count] = array("d", [amount_remaining]) * count
+            row += count
+
+    return Schedule(portfolio.loan_ids, offsets, payments, amounts_remaining, remaining_durations)
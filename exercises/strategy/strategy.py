@@ -1,4 +1,7 @@
 from dataclasses import dataclass
+from time import perf_counter
+
+from .. import instrumentation
 
 
 # Models:
@@ -24,6 +27,17 @@ class MonthlyRepayment:
 
 
 def create_monthly_repayment(loan_info: LoanInfo) -> MonthlyRepayment:
+    metrics = instrumentation.active
+    if metrics is None:
+        return _create_monthly_repayment(loan_info)
+    start = perf_counter()
+    repayment = _create_monthly_repayment(loan_info)
+    metrics.observe("exercises_repayment_seconds", "kind", loan_info.loan_kind, perf_counter() - start)
+    metrics.count("exercises_repayments_total", "kind", loan_info.loan_kind)
+    return repayment
+
+
+def _create_monthly_repayment(loan_info: LoanInfo) -> MonthlyRepayment:
     interest_payment = loan_info.amount * loan_info.interest / 12 / 100
     variable_interest_payment = loan_info.amount * (loan_info.interest + loan_info.libor) / 12 / 100
     repayment = loan_info.amount / loan_info.remaining_duration
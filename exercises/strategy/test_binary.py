@@ -0,0 +1,95 @@
+from dataclasses import replace
+
+import pytest
+
+from . import binary
+from .benchmark import generate_loans
+from .binary import LoanBook, RepaymentsFile, process_book, write_book
+from .strategy import create_monthly_repayment
+
+
+def test_book_round_trip(tmp_path):
+    loans = generate_loans(1_000)
+    loans[0].loan_id = "ünïcode-0"
+    write_book(tmp_path / "book.bin", loans)
+
+    with LoanBook(tmp_path / "book.bin") as book:
+        assert len(book) == 1_000
+        assert list(book) == loans
+        assert sorted(book.kinds) == sorted({loan.loan_kind for loan in loans})
+        portfolio = book.portfolio(10, 20)
+        assert list(portfolio.amounts) == [loan.amount for loan in loans[10:20]]
+        del portfolio
+
+
+def test_close_with_a_live_portfolio_still_closes_the_file(tmp_path):
+    loans = generate_loans(10)
+    write_book(tmp_path / "book.bin", loans)
+    book = LoanBook(tmp_path / "book.bin")
+    portfolio = book.portfolio()
+
+    with pytest.raises(BufferError):
+        book.close()
+    assert book._file.closed
+    assert list(portfolio.amounts) == [loan.amount for loan in loans]
+    del portfolio
+    book._mapped.close()
+
+
+def test_process_book_reports_a_loan_with_no_remaining_duration(tmp_path):
+    loans = generate_loans(1_000)
+    loans[650] = replace(loans[650], remaining_duration=0)
+    write_book(tmp_path / "book.bin", loans)
+
+    with pytest.raises(ZeroDivisionError, match=f"Loan '{loans[650].loan_id}' has no remaining duration"):
+        process_book(tmp_path / "book.bin", tmp_path / "out.bin", chunk_size=300)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["book.bin"]
+
+
+def test_process_book_removes_its_output_when_a_chunk_fails(tmp_path, monkeypatch):
+    def fail(portfolio):
+        raise RuntimeError(f"{len(portfolio)} loans")
+
+    monkeypatch.setattr(binary, "create_monthly_repayments", fail)
+    write_book(tmp_path / "book.bin", generate_loans(1_000))
+
+    with pytest.raises(RuntimeError, match="300 loans"):
+        process_book(tmp_path / "book.bin", tmp_path / "out.bin", chunk_size=300)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["book.bin"]
+
+
+def test_an_error_with_a_live_portfolio_is_not_hidden_by_closing(tmp_path):
+    write_book(tmp_path / "book.bin", generate_loans(10))
+
+    with pytest.raises(KeyError):
+        with LoanBook(tmp_path / "book.bin") as book:
+            portfolio = book.portfolio()
+            raise KeyError("from the with block")
+    del portfolio
+
+
+def test_process_book_in_chunks(tmp_path):
+    loans = generate_loans(1_000)
+    write_book(tmp_path / "book.bin", loans)
+
+    assert process_book(tmp_path / "book.bin", tmp_path / "out.bin", chunk_size=300) == 1_000
+    with RepaymentsFile(tmp_path / "out.bin") as repayments:
+        assert list(repayments) == [create_monthly_repayment(loan) for loan in loans]
+
+
+def test_wrong_file(tmp_path):
+    write_book(tmp_path / "book.bin", generate_loans(10))
+    process_book(tmp_path / "book.bin", tmp_path / "out.bin")
+
+    with pytest.raises(ValueError):
+        LoanBook(tmp_path / "out.bin")
+    with pytest.raises(ValueError):
+        RepaymentsFile(tmp_path / "book.bin")
+
+
+def test_empty_book(tmp_path):
+    write_book(tmp_path / "book.bin", [])
+
+    assert process_book(tmp_path / "book.bin", tmp_path / "out.bin") == 0
+    with RepaymentsFile(tmp_path / "out.bin") as repayments:
+        assert list(repayments) == []
@@ -0,0 +1,43 @@
+from .benchmark import generate_loans
+from .cache import RepaymentCache, changed_rows
+from .portfolio import KIND_CODES, Portfolio, create_monthly_repayments
+
+
+def test_cached_runs_match_full_runs():
+    portfolio = Portfolio.from_loans(generate_loans(2_000))
+    cache = RepaymentCache()
+    assert cache.run(portfolio) == create_monthly_repayments(portfolio)
+    assert cache.hit_rate == 0
+
+    for row in range(0, 2_000, 7):
+        portfolio.libors[row] += 0.25
+        portfolio.credit_scores[row] = 1_000 - portfolio.credit_scores[row]
+    portfolio.amounts[3] += 1
+    portfolio.remaining_durations[4] = 1
+    assert cache.run(portfolio) == create_monthly_repayments(portfolio)
+    assert 1_500 < sum(cache.hits.values()) < 2_000
+    assert cache.kind_hit_rates()["interest_and_repayment"] > cache.kind_hit_rates()["v_interest_and_repayment"]
+
+    # Another set of loans is worked out in full
+    other = Portfolio.from_loans(generate_loans(100, seed=1))
+    misses = sum(cache.misses.values())
+    assert cache.run(other) == create_monthly_repayments(other)
+    assert sum(cache.misses.values()) == misses + 100
+
+
+def test_only_relevant_changes_are_worked_out():
+    portfolio = Portfolio.from_loans(generate_loans(10))
+    kinds = ["interest_only", "v_interest_and_repayment", "good_credit_score", "introductory_offer_3"]
+    for row, kind in enumerate(kinds):
+        portfolio.kinds[row] = KIND_CODES[kind]
+    portfolio.credit_scores[2] = 650
+    previous = portfolio.copy()
+
+    for row in range(len(kinds)):
+        portfolio.libors[row] += 1
+        portfolio.original_durations[row] += 1
+    portfolio.credit_scores[2] = 690
+    assert changed_rows(previous, portfolio) == [1, 3]
+
+    portfolio.credit_scores[2] = 700
+    assert changed_rows(previous, portfolio) == [1, 2, 3]
@@ -0,0 +1,40 @@
+import pytest
+
+from .benchmark import generate_loans
+from .portfolio import DEFAULT_KIND, KINDS, Portfolio, create_monthly_repayments
+from .strategy import LoanInfo, create_monthly_repayment
+
+
+def test_portfolio_matches_create_monthly_repayment():
+    loans = generate_loans(5_000)
+    # The edges of every condition: last month, end of an offer and the credit score thresholds
+    for index, kind in enumerate([*KINDS, "legacy"]):
+        for remaining_duration in (1, 2, 24, 27, 28, 30, 31):
+            for score in (499, 500, 649, 650, 699, 700, 849, 850):
+                loans.append(LoanInfo(f"edge-{index}", kind, 36, remaining_duration, 5, 10000, score, 3))
+
+    portfolio = Portfolio.from_loans(loans)
+    repayments = create_monthly_repayments(portfolio)
+
+    assert len(repayments) == len(loans)
+    assert list(repayments) == [create_monthly_repayment(loan) for loan in loans]
+    assert portfolio.kinds[-1] == DEFAULT_KIND
+
+
+def test_kind_rows_are_kept_until_a_loan_is_appended():
+    portfolio = Portfolio.from_loans(generate_loans(100))
+    rows = portfolio.kind_rows()
+    assert portfolio.kind_rows() is rows
+    assert sorted(row for kind_rows in rows.values() for row in kind_rows) == list(range(100))
+
+    portfolio.append(LoanInfo("new", "interest_only", 12, 12, 5, 100, 700, 3))
+    assert portfolio.kind_rows()[0][-1] == 100
+
+
+def test_no_remaining_duration_raises():
+    loans = generate_loans(10)
+    loans[3].remaining_duration = 0
+    with pytest.raises(ZeroDivisionError):
+        create_monthly_repayment(loans[3])
+    with pytest.raises(ZeroDivisionError, match=loans[3].loan_id):
+        create_monthly_repayments(Portfolio.from_loans(loans))
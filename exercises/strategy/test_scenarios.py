@@ -0,0 +1,57 @@
+from dataclasses import replace
+
+from .benchmark import generate_loans
+from .portfolio import KIND_CODES, Portfolio
+from .scenarios import KindTotals, SharedPortfolio, attach_portfolio, evaluate_scenarios, scenario_grid, sweep
+from .strategy import create_monthly_repayment
+
+
+LOANS = generate_loans(2_000)
+SCENARIOS = scenario_grid([None, 0.5, 4.25], [-200, 0, 100])
+
+
+def expected_totals(scenario) -> dict[str, KindTotals]:
+    totals: dict[str, KindTotals] = {}
+    for loan in LOANS:
+        repayment = create_monthly_repayment(
+            replace(
+                loan,
+                libor=loan.libor if scenario.libor is None else scenario.libor,
+                current_credit_score=loan.current_credit_score + scenario.credit_score_change,
+            )
+        )
+        kind = loan.loan_kind if loan.loan_kind in KIND_CODES else "default"
+        totals.setdefault(kind, KindTotals()).add(
+            KindTotals(1, round(repayment.payment * 10_000), round(repayment.amount_remaining * 10_000))
+        )
+    return totals
+
+
+def test_evaluate_scenarios_matches_create_monthly_repayment():
+    results = evaluate_scenarios(Portfolio.from_loans(LOANS), SCENARIOS)
+
+    assert [result.scenario for result in results] == SCENARIOS
+    for result in results:
+        assert result.kinds == expected_totals(result.scenario)
+        assert result.total.loans == len(LOANS)
+
+
+def test_sweep_matches_evaluate_scenarios():
+    portfolio = Portfolio.from_loans(LOANS)
+
+    assert sweep(portfolio, SCENARIOS, max_workers=2) == evaluate_scenarios(portfolio, SCENARIOS)
+
+
+def test_attached_portfolio_shares_the_columns():
+    portfolio = Portfolio.from_loans(LOANS[:10])
+    with SharedPortfolio(portfolio) as shared:
+        memory, attached = attach_portfolio(shared.memory.name, shared.count)
+
+        assert len(attached) == 10
+        assert list(attached.amounts) == list(portfolio.amounts)
+        assert list(attached.kinds) == list(portfolio.kinds)
+
+        for column in vars(attached).values():
+            if isinstance(column, memoryview):
+                column.release()
+        memory.close()
@@ -0,0 +1,63 @@
+from dataclasses import replace
+
+from .benchmark import feed_back, generate_loans
+from .portfolio import KINDS, SCHEMES, Group, Portfolio, RepaymentRule, _strategy
+from .schedule import _month, iter_schedule, project_portfolio
+from .strategy import LoanInfo
+
+
+def loans() -> list[LoanInfo]:
+    loans = generate_loans(200)
+    for index, kind in enumerate([*KINDS, "legacy"]):
+        for score in (499, 649, 700, 850):
+            loans.append(LoanInfo(f"edge-{index}-{score}", kind, 36, 36, 5, 10000, score, 3))
+    loans.append(LoanInfo("rounded", "interest_only", 360, 360, 3.5, 123456.78912345, 700, 1))
+    loans.append(LoanInfo("finished", "interest_only", 12, 0, 5, 0, 700, 3))
+    return loans
+
+
+def test_iter_schedule_matches_feeding_back():
+    for loan in loans():
+        assert list(iter_schedule(loan)) == feed_back(loan)
+
+
+def test_project_portfolio_matches_feeding_back():
+    schedule = project_portfolio(Portfolio.from_loans(loans()))
+
+    assert list(schedule) == [repayment for loan in loans() for repayment in feed_back(loan)]
+    assert len(schedule) == sum(max(loan.remaining_duration, 0) for loan in loans())
+    assert list(schedule.loan(len(loans()) - 1)) == []
+
+
+def test_interest_only_months_are_jumped_over():
+    loan = LoanInfo("123-456", "interest_only", 360, 360, 5, 10000, 700, 3)
+    months = list(iter_schedule(replace(loan, amount=10000.00001)))
+
+    assert len(months) == 360
+    assert {month.payment for month in months[1:-1]} == {41.6667}
+    assert months[-1].payment == 10041.6667 and months[-1].amount_remaining == 0
+
+
+def test_both_paths_repay_any_rule_the_same():
+    portfolio = Portfolio.from_loans(loans())
+    group = Group(portfolio, list(range(len(portfolio) - 1)))
+    for scheme in SCHEMES:
+        for variable in (False, True):
+            for months, threshold in ((2, 600), (24, 800)):
+                rule = RepaymentRule(scheme, variable, months, threshold)
+                payments, amounts_remaining = _strategy(rule)(group)
+                months_by_row = [
+                    _month(
+                        rule,
+                        portfolio.amounts[row],
+                        portfolio.remaining_durations[row],
+                        portfolio.original_durations[row],
+                        portfolio.interests[row],
+                        portfolio.libors[row],
+                        portfolio.credit_scores[row],
+                    )
+                    for row in group.rows
+                ]
+                assert [(round(payment, 4), round(amount, 4)) for payment, amount in months_by_row] == [
+                    (round(payment, 4), round(amount, 4)) for payment, amount in zip(payments, amounts_remaining)
+                ]
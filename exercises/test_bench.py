@@ -0,0 +1,51 @@
+from dataclasses import asdict, replace
+
+from click.testing import CliRunner
+
+from .bench import BASELINE, BASELINE_FIELDS, WORKLOADS, bench_cli, compare, load_baseline, run_workload, save_baseline
+
+
+def test_workloads_run_at_a_small_scale():
+    for workload in WORKLOADS:
+        result = run_workload(workload, scale=0.01)
+        # The composite workload splits its size evenly between the populations
+        assert int(workload.size * 0.01) - 3 < result.items <= int(workload.size * 0.01)
+        assert result.throughput > 0
+        assert result.p50_ms <= result.p99_ms
+
+
+def test_compare_reports_regressions(tmp_path):
+    result = run_workload(WORKLOADS[2], scale=0.01)
+    path = tmp_path / "baseline.json"
+    save_baseline(path, [result])
+    baseline = load_baseline(path)
+    assert baseline == {"strategy": {key: asdict(result)[key] for key in BASELINE_FIELDS}}
+    assert compare([result], baseline) == []
+
+    slower = replace(result, relative=result.relative / 2, peak_mib=result.peak_mib * 2 + 2)
+    assert [message.split(":")[1].split()[0] for message in compare([slower], baseline)] == ["relative", "peak"]
+    assert compare([replace(result, items=1)], baseline) == ["strategy: baseline has 5000 loans, this run 1"]
+    assert compare([replace(result, name="other")], baseline) == []
+
+
+def test_cli_saves_a_baseline_and_compares_with_it(tmp_path):
+    path = tmp_path / "baseline.json"
+    arguments = ["--only", "strategy", "--scale", "0.01"]
+    saved = CliRunner().invoke(bench_cli, [*arguments, "--save-baseline", str(path)])
+    assert saved.exit_code == 0, saved.output
+    assert load_baseline(path)["strategy"]["items"] == 5_000
+
+    # Timings of a run this small are noisy, so only a wildly worse run may fail
+    compared = CliRunner().invoke(bench_cli, [*arguments, "--baseline", str(path), "--tolerance", "0.95"])
+    assert compared.exit_code == 0, compared.output
+
+    path.write_text(path.read_text().replace('"items": 5000', '"items": 1'))
+    mismatched = CliRunner().invoke(bench_cli, [*arguments, "--baseline", str(path)])
+    assert mismatched.exit_code == 1
+    assert "baseline has 1 loans, this run 5000" in mismatched.output
+
+
+def test_stored_baseline_covers_every_workload_without_absolute_figures():
+    baseline = load_baseline(BASELINE)
+    assert set(baseline) == {workload.name for workload in WORKLOADS}
+    assert all(set(result) == set(BASELINE_FIELDS) for result in baseline.values())
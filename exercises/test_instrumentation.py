@@ -0,0 +1,58 @@
+import pickle
+
+from . import instrumentation
+from .command.command import Command, execute_commands
+from .composite.composite import validate
+from .strategy.benchmark import generate_loans
+from .strategy.portfolio import Portfolio, create_monthly_repayments
+
+
+def test_metrics_are_only_collected_while_on():
+    execute_commands([Command("insert", id=1, value="Hello")])
+    assert instrumentation.active is None
+
+    with instrumentation.collecting() as metrics:
+        execute_commands(
+            [
+                Command("insert", id=1, value="Hello World"),
+                Command("insert", id=1, value="Again"),
+                Command("split", id=1, other_id=2),
+                Command("delete", id=3),
+                Command("commit"),
+            ]
+        )
+        validate({"federation_provider": "foo", "federation_id": "1"})
+        validate({"user_id": "12345678"})
+        portfolio = Portfolio.from_loans(generate_loans(100))
+        create_monthly_repayments(portfolio)
+    assert instrumentation.active is None
+
+    assert metrics.counters["exercises_commands_total"] == {"insert": 2, "split": 1, "delete": 1, "commit": 1}
+    assert metrics.counters["exercises_commands_skipped_total"] == {"insert": 1, "delete": 1}
+    assert metrics.histograms["exercises_command_seconds"]["insert"].count == 2
+    assert metrics.counters["exercises_validations_total"] == {"valid": 1, "invalid": 1}
+    failed = metrics.counters["exercises_rule_groups_failed_total"]
+    assert failed["federation"] == 1 and failed["login"] == 2 and failed["user_id"] == 1
+    assert sum(metrics.counters["exercises_repayments_total"].values()) == 100
+
+
+def test_metrics_export():
+    metrics = instrumentation.Metrics()
+    metrics.count("exercises_commands_total", "kind", 'say "hi"')
+    metrics.observe("exercises_command_seconds", "kind", "insert", 3e-6)
+    metrics.observe("exercises_command_seconds", "kind", "insert", 2.0)
+
+    # Worker processes send their metrics back to be added up
+    merged = instrumentation.Metrics()
+    merged.add(pickle.loads(pickle.dumps(metrics)))
+    merged.add(metrics)
+    text = merged.prometheus()
+    assert 'exercises_commands_total{kind="say \\"hi\\""} 2\n' in text
+    assert 'exercises_command_seconds_bucket{kind="insert",le="2.5e-06"} 0\n' in text
+    assert 'exercises_command_seconds_bucket{kind="insert",le="5e-06"} 2\n' in text
+    assert 'exercises_command_seconds_bucket{kind="insert",le="+Inf"} 4\n' in text
+    assert 'exercises_command_seconds_count{kind="insert"} 4\n' in text
+
+    histogram = merged.as_dict()["histograms"]["exercises_command_seconds"]
+    assert histogram["label"] == "kind"
+    assert histogram["values"]["insert"]["buckets"]["1"] == 2
@@ -0,0 +1,17 @@
+from .pool import map_bounded
+
+
+def test_map_bounded_keeps_order_and_only_reads_ahead_a_little():
+    read: list[int] = []
+
+    def arguments():
+        for number in range(20):
+            read.append(number)
+            yield number, 2
+
+    results = map_bounded(pow, arguments(), max_workers=2)
+
+    assert next(results) == 0
+    # Two calls per worker are in flight when the first result is taken, and one more was read to make room for
+    assert len(read) == 5
+    assert list(results) == [number**2 for number in range(1, 20)]
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+
+from .serve import call, start_server
+
+
+def test_serve_answers_every_kind_of_request(tmp_path):
+    path = str(tmp_path / "serve.sock")
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(start_server(path))
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    try:
+        loan = {
+            "loan_id": "123-456",
+            "loan_kind": "interest_and_repayment",
+            "original_duration": 36,
+            "remaining_duration": 36,
+            "interest": 5,
+            "amount": 10000,
+            "current_credit_score": 700,
+            "libor": 3,
+        }
+        responses = call(
+            path,
+            [
+                {"kind": "command", "commands": [{"command_kind": "insert", "id": 1, "value": "Hello"}]},
+                {"kind": "validate", "user_data": {"federation_provider": "foo", "federation_id": "1"}},
+                {"kind": "repayment", "loan": loan},
+                {"kind": "unknown"},
+                {"kind": "validate"},
+                {"kind": "metrics"},
+            ],
+        )
+        # Many more requests than fit in the socket buffers at once
+        many = call(path, [{"kind": "validate", "user_data": {}}] * 5_000)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+    assert responses == [
+        {"document": {"1": "Hello"}},
+        {"valid": True, "errors": ""},
+        {"loan_id": "123-456", "payment": 319.4444, "amount_remaining": 9722.2222, "remaining_duration": 35},
+        {"error": "KeyError: 'unknown'"},
+        {"error": "KeyError: 'user_data'"},
+        {"metrics": None},
+    ]
+    assert len(many) == 5_000 and not many[-1]["valid"]